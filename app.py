@@ -1,9 +1,29 @@
 import streamlit as st
-import requests
-from datetime import datetime, timedelta
+from datetime import datetime
 import pandas as pd
 
+from author_cache import get_author_cache
+from institution_registry import get_institution_registry
+from works_store import get_works_store
+from openalex_client import RequestStats, SearchTrace, get_backend
+from result_cache import get_result_cache
+from result_index import FACETS, get_result_index
+from run_history import CHANGED, NEW, get_run_history
+from digest import DIGEST_FORMATS, MIME_TYPES, digest_bytes
+from roster import ROSTER_EXTENSIONS, dedupe_names, parse_roster, roster_columns
+from search_jobs import CANCELLED, DONE, get_job_manager
+from results_table import EXPORT_EXCLUDED_COLUMNS, SORT_ORDERS, build_results, institution_matrix, view_positions, vip_styles
+from search_engine import TIME_HORIZON_DAYS, get_vip_matcher
+
 import base64
+import json
+import math
+import time
+
+# Results table paging: rows per page offered, and views (horizon, sort,
+# filter) whose row positions are kept per session
+PAGE_SIZES = [50, 100, 250, 500]
+RESULT_VIEW_CACHE_SIZE = 8
 
 # Page configuration
 st.set_page_config(page_title="Chewie (Academic Scout)", page_icon="🔍", layout="wide")
@@ -78,216 +98,6 @@ def add_bg_image():
 
 add_bg_image()
 
-# OpenAlex API base URL
-OPENALEX_API = "https://api.openalex.org/works"
-
-# University mappings to OpenAlex institution IDs and display names
-UNIVERSITY_IDS = {
-    "UC Berkeley": ["I95457486", "I148283060"],   # UC Berkeley + Lawrence Berkeley National Lab
-    "UC Berkeley & UCSF": ["I95457486", "I148283060", "I180670191"], # UC Berkeley + LBL + UCSF
-    "Stanford": ["I4200000001"],    # Stanford University
-    "MIT": ["I127595847"],          # Massachusetts Institute of Technology
-    "Harvard": ["I136199984"]       # Harvard University
-}
-
-UNIVERSITY_DISPLAY_NAMES = {
-    "UC Berkeley": "University of California, Berkeley",
-    "Stanford": "Stanford University",
-    "MIT": "Massachusetts Institute of Technology",
-    "Harvard": "Harvard University"
-}
-
-# VIP Authors List
-VIP_AUTHORS = {
-    "Chunlei Liu", "Jennifer Listgarten", "Jun-Chau Chien", "Jack Gallant", 
-    "Preeya Khanna", "Doris Tsao", "William Jagust", "Gül Dölen", 
-    "Richard Ivry", "Markita Landry", "John G. Flannery", "James Olzmann", 
-    "Roberto Zoncu", "Fyodor Urnov", "James Nuñez", "Margaux Pinney", 
-    "Kathleen Collins", "Xavier Darzacq", "Michael Rape", "David Schaffer", 
-    "Ehud Isacoff", "David Nguyen", "Doug Koshland", "Robert Tjian", 
-    "Daniel Portnoy", "David Savage", "Peter Sudmant", "Britt Glaunsinger", 
-    "Andrea Gomez", "Robert Saxton", "Jennifer A. Doudna", "Daniel K. Nomura", 
-    "Ashok Ajoy", "Kevan Shokat", "Peidong Yang", "Matthew B. Francis", 
-    "Jennifer Bergner", "Jay T. Groves", "Omar Yaghi", "Karthik Shekhar", 
-    "Rebecca Bart", "Adam Arkin", "Kevin Healy", "Phillip Messersmith", 
-    "John Dueber", "Dorian Liepmann", "Derfogail Delcassian", "Rikky Muller"
-}
-
-def get_recent_papers(university_id, author_names, days_back, university_display_name=None):
-    """
-    Queries OpenAlex for papers by specific authors at a specific institution
-    from the last X days using a two-step approach:
-    1. Find author IDs by searching authors endpoint
-    2. Use author IDs to find their works
-    """
-    # Calculate the date (YYYY-MM-DD) - 90 days ago
-    start_date = (datetime.now() - timedelta(days=days_back)).strftime('%Y-%m-%d')
-    
-    # Clean up author names
-    authors_list = [name.strip() for name in author_names.split(',') if name.strip()]
-    
-    
-    if not authors_list:
-        return pd.DataFrame(), []
-    
-    # Handle university_id being a list or string
-    if isinstance(university_id, str):
-        university_ids = [university_id]
-    else:
-        university_ids = university_id
-    
-    # Create pipe-separated string for OR query
-    institutions_str = "|".join(university_ids)
-
-    # STEP 1: Get Author IDs
-    author_ids = []
-    missing_authors = []
-    authors_url = "https://api.openalex.org/authors"
-    
-    for author_name in authors_list:
-        found_match = False
-        try:
-            # Smart Search:
-            # 1. Search by Last Name (most specific token)
-            # 2. Filter results by checking if all parts of the input name exist in the result name
-            
-            name_parts = author_name.strip().split()
-            if not name_parts:
-                continue
-                
-            last_name = name_parts[-1]
-            
-            # Using 'last_known_institutions.id' (plural) as per OpenAlex API
-            # Search for the Last Name to cast a wide net, then filter
-            params = {
-                'filter': f'display_name.search:{last_name},last_known_institutions.id:{institutions_str}',
-                'per_page': 50
-            }
-            
-            response = requests.get(authors_url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            results = data.get('results', [])
-            if results:
-                # Filter results: Check if all parts of the input name match
-                for result in results:
-                    display_name = result.get('display_name', '')
-                    # Case-insensitive check if all parts of input name are in the display name
-                    if all(part.lower() in display_name.lower() for part in name_parts):
-                        author_id = result.get('id')
-                        if author_id:
-                            author_ids.append(author_id)
-                            found_match = True
-            
-            if not found_match:
-                missing_authors.append(author_name)
-                
-        except requests.exceptions.RequestException as e:
-            # Handle 400 Bad Request specifically to generic warning if needed, but the fix should prevent it
-            # st.warning(f"Error searching for author '{author_name}': {str(e)}")
-            missing_authors.append(author_name)
-            continue
-    
-    if not author_ids:
-        return pd.DataFrame(), missing_authors
-    
-    
-    # STEP 2: Get Papers using Author IDs
-    works_url = "https://api.openalex.org/works"
-    
-    all_works = []
-    # Batch size to prevent URL length errors (400 Bad Request)
-    # OpenAlex allows OR queries but long URLs fail. 25-50 is a safe chunk size.
-    chunk_size = 25
-    
-    for i in range(0, len(author_ids), chunk_size):
-        chunk_ids = author_ids[i:i + chunk_size]
-        author_ids_str = "|".join(chunk_ids)
-        
-        # Filter by author IDs, publication date, and institution
-        filter_str = (
-            f"authorships.author.id:{author_ids_str},"
-            f"authorships.institutions.id:{institutions_str},"
-            f"publication_date:>{start_date}"
-        )
-        
-        params = {
-            'filter': filter_str,
-            'sort': 'publication_date:desc',
-            'per_page': 200
-        }
-        
-        try:
-            response = requests.get(works_url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            all_works.extend(data.get('results', []))
-            
-        except requests.exceptions.RequestException as e:
-            st.warning(f"Error fetching batch of works: {str(e)}")
-            continue
-
-    # Process all results
-    works = all_works
-        
-    # Format results
-    results = []
-    
-    for work in works:
-        title = work.get('display_name', 'Untitled')
-        pub_date = work.get('publication_date', 'Unknown')
-        
-        # Check authorship for VIPs to highlight title
-        is_vip_paper = False
-        authorships = work.get('authorships', [])
-        
-        # Check if any author on the paper matches our VIP list
-        for authorship in authorships:
-            auth_name = authorship.get('author', {}).get('display_name') or ''
-            if any(vip_name.lower() in auth_name.lower() for vip_name in VIP_AUTHORS):
-                is_vip_paper = True
-                break
-        
-        if is_vip_paper:
-            # title = "➡️ " + title # Reverted as per user request
-            pass
-        
-        # Get journal name
-        location = work.get('primary_location') or {}
-        source = location.get('source') or {}
-        journal = source.get('display_name', 'Unknown Journal')
-        
-        # Get link
-        link = location.get('landing_page_url') or work.get('doi') or '#'
-        
-        # Format authors
-        author_names_list = [a.get('author', {}).get('display_name', 'Unknown') for a in authorships]
-        author_str = ", ".join(author_names_list[:3])
-        if len(authorships) > 3:
-            author_str += " et al."
-        
-        results.append({
-            "Title": title,
-            "Authors": author_str,
-            "Date": pub_date,
-            "Journal": journal,
-            "Link": link,
-            "_is_vip": is_vip_paper # Hidden column for styling
-        })
-    
-    df = pd.DataFrame(results)
-    if not df.empty:
-        # Deduplicate: Keep earliest version
-        # 1. Sort by Date ascending (oldest first)
-        df = df.sort_values('Date', ascending=True)
-        # 2. Drop duplicates on Title+Authors, keeping the first (oldest)
-        df = df.drop_duplicates(subset=['Title', 'Authors'], keep='first')
-        # 3. Sort by Date descending (newest first) for final display
-        df = df.sort_values('Date', ascending=False)
-
-    return df, missing_authors
-
 # Main app
 # Header with custom icon
 col1, col2 = st.columns([1, 10])
@@ -300,21 +110,50 @@ st.markdown("Find recent papers from authors at selected universities")
 # Sidebar
 with st.sidebar:
     st.header("Search Parameters")
+    snapshot_backend = get_backend()
+    if snapshot_backend is not None:
+        st.caption(f"Offline mode: searching the snapshot index in {snapshot_backend.directory}")
     
-    # University selection
-    university = st.selectbox(
-        "Select University",
-        options=list(UNIVERSITY_IDS.keys()),
-        index=0
+    # University selection: saved bundles and/or any institutions from the
+    # local registry. Several selections are searched in one run and compared.
+    institution_registry = get_institution_registry()
+    institution_groups = institution_registry.groups()
+    university_choices = st.multiselect(
+        "Select Universities",
+        options=list(institution_groups.keys()) + ["Custom..."],
+        default=list(institution_groups.keys())[:1],
+        help="Pick several to compare them: each author is looked up once across all of them."
     )
+    selected_groups = {
+        choice: institution_groups[choice] for choice in university_choices if choice != "Custom..."
+    }
+    if "Custom..." in university_choices:
+        # Type-ahead runs against the in-memory registry index, not the API
+        institution_query = st.text_input("Find institutions", placeholder="Name or acronym, e.g. 'berkeley lab'")
+        matches = institution_registry.search(institution_query) if institution_query else []
+        st.multiselect(
+            "Institutions",
+            options=list(dict.fromkeys(
+                st.session_state.get('institution_ids', []) + [match['id'] for match in matches]
+            )),
+            format_func=institution_registry.display_name,
+            key='institution_ids'
+        )
+        custom_ids = list(st.session_state['institution_ids'])
+        if st.checkbox("Include affiliated institutions", help="Adds institutions OpenAlex lists as children of the selected ones."):
+            custom_ids += institution_registry.children(custom_ids)
+        if custom_ids:
+            selected_groups[institution_registry.label(custom_ids)] = custom_ids
+        preset_name = st.text_input("Save selection as", placeholder="Preset name")
+        if preset_name and custom_ids and st.button("Save preset", use_container_width=True):
+            institution_registry.save_group(preset_name, custom_ids)
+            st.caption(f"Saved '{preset_name}'.")
+    # One search covers the union of every selected institution
+    university_ids = list(dict.fromkeys(i for ids in selected_groups.values() for i in ids))
+    university = ", ".join(selected_groups) if selected_groups else "no institution"
     
     # Time Horizon selection
-    time_horizon_options = {
-        "1 Month": 30,
-        "3 Months": 90,
-        "6 Months": 180,
-        "1 Year": 365
-    }
+    time_horizon_options = TIME_HORIZON_DAYS
     
     time_horizon = st.selectbox(
         "Time Horizon",
@@ -334,17 +173,25 @@ with st.sidebar:
     
     st.markdown("OR")
     
-    # Excel file uploader
-    uploaded_file = st.file_uploader("Upload Excel file with author names", type=['xlsx', 'xls'])
+    # Roster file uploader (parsed uploads are cached by file hash across reruns)
+    uploaded_file = st.file_uploader(
+        "Upload a roster file with author names",
+        type=[extension.lstrip('.') for extension in ROSTER_EXTENSIONS],
+        help="Excel, CSV, TSV or text file. 'Last, First' names are turned into 'First Last'."
+    )
     if uploaded_file:
         try:
-            df_authors = pd.read_excel(uploaded_file)
-            if not df_authors.empty:
-                # Assume first column has names
-                file_authors = df_authors.iloc[:, 0].dropna().astype(str).tolist()
+            roster_bytes = uploaded_file.getvalue()
+            columns = roster_columns(roster_bytes, uploaded_file.name)
+            name_column = 0
+            if len(columns) > 1:
+                name_column = st.selectbox(
+                    "Name column", range(len(columns)), format_func=lambda i: columns[i]
+                )
+            file_authors = parse_roster(roster_bytes, uploaded_file.name, column=name_column)
+            if file_authors:
                 st.success(f"Loaded {len(file_authors)} authors from file.")
             else:
-                file_authors = []
                 st.warning("Uploaded file is empty.")
         except Exception as e:
             st.error(f"Error reading file: {str(e)}")
@@ -352,107 +199,355 @@ with st.sidebar:
     else:
         file_authors = []
     
+    # Tracing keeps a record per OpenAlex request; off by default since plain stats are cheaper
+    trace_enabled = st.checkbox(
+        "Record performance trace",
+        value=False,
+        help="Record latency, status, size and retries of every OpenAlex request for the Performance panel."
+    )
+    
     # Search button
     search_button = st.button("🔍 Search", type="primary", use_container_width=True)
+    
+    # Author lookups, work sync watermarks and shared results persist between searches; allow a manual reset
+    if st.button("Clear cached lookups", use_container_width=True):
+        removed = get_author_cache().invalidate(institution_ids=university_ids)
+        get_works_store().invalidate(institution_ids=university_ids)
+        get_result_cache().invalidate(institution_ids=university_ids)
+        st.caption(f"Cleared {removed} cached author lookup(s) for {university}; works will be refetched.")
+
+def cached_view(results_df, days_back, sort="Newest first", vip_only=False, refine=None):
+    """
+    Row positions of this session's results for one view (see
+    view_positions); the last few are kept. `refine` holds in-result search
+    and facet selections (result_index mask() arguments).
+    """
+    views = st.session_state.setdefault('result_views', {})
+    refine = refine or {}
+    key = (st.session_state['results_key'], days_back, sort, vip_only, tuple(sorted(refine.items())))
+    if key not in views:
+        if len(views) >= RESULT_VIEW_CACHE_SIZE:
+            views.pop(next(iter(views)))
+        mask = None
+        if any(refine.values()):
+            mask = get_result_index(st.session_state['results_key'], results_df).mask(
+                days_back, vip_only=vip_only, **refine
+            )
+        views[key] = view_positions(results_df, days_back, sort, vip_only, mask=mask)
+    return views[key]
+
+def cached_changes(results_df):
+    """
+    Papers in this session's results that are new or changed since the
+    roster's last recorded run, and that run (see run_history). Computed
+    once per results table.
+    """
+    digest = st.session_state.get('digest')
+    if digest is None or digest['results_key'] != st.session_state['results_key']:
+        search_params = st.session_state['search_params']
+        changes, last_run = get_run_history().changes(
+            search_params['author_names'], search_params['university_id'], results_df
+        )
+        digest = {'results_key': st.session_state['results_key'], 'changes': changes, 'last_run': last_run, 'files': {}}
+        st.session_state['digest'] = digest
+    return digest['changes'], digest['last_run']
+
+def cached_digest_file(changes, digest_format):
+    """The digest file for the current changes, written once per format."""
+    files = st.session_state['digest']['files']
+    if digest_format not in files:
+        files[digest_format] = digest_bytes(changes, digest_format)
+    return files[digest_format]
+
+def submit_search(search_params, label):
+    """Runs a search in the background as this session's job, replacing any it has running."""
+    if trace_enabled:
+        request_stats = SearchTrace(label=label)
+    else:
+        request_stats = RequestStats()
+    if 'search_job_id' in st.session_state:
+        get_job_manager().cancel(st.session_state['search_job_id'])
+    job = get_job_manager().submit(search_params, stats=request_stats)
+    st.session_state['search_job_id'] = job.id
+    st.session_state['search_job_label'] = label
+
+def load_shared_results():
+    """This session's results table from the shared cache, or None if it was evicted or has expired."""
+    cached = get_result_cache().get(st.session_state['results_key'])
+    return cached[0] if cached is not None else None
 
 # Main content area logic
 if search_button:
-    if not author_input.strip() and not file_authors:
+    if not university_ids:
+        st.warning("Please select at least one institution.")
+    elif not author_input.strip() and not file_authors:
         st.warning("Please enter at least one author name or upload a file.")
     else:
-        # Parse author names from text area
-        text_authors = [name.strip() for name in author_input.split("\n") if name.strip()]
-        
-        # Combine with file authors
-        author_names = list(set(text_authors + [name.strip() for name in file_authors if name.strip()]))
+        # Combine text area and file names; cleaned and de-duplicated in input order
+        author_names = dedupe_names(author_input.split("\n") + file_authors)
         
         if not author_names:
             st.warning("Please enter at least one valid author name.")
         else:
-            with st.spinner(f"Searching for papers from {len(author_names)} author(s) at {university} (fetching last 1 year)..."):
-                university_id = UNIVERSITY_IDS[university]
-                university_display_name = UNIVERSITY_DISPLAY_NAMES.get(university)
-                # Convert list of author names to comma-separated string
-                author_names_str = ", ".join(author_names)
-                
-                # ALWAYS fetch 365 days (1 Year) to allow filtering later
-                df, missing_authors = get_recent_papers(university_id, author_names_str, days_back=365, university_display_name=university_display_name)
-                
-                # Store in session state
-                st.session_state['results_df'] = df
-                st.session_state['missing_authors'] = missing_authors
-                st.session_state['has_searched'] = True
-                
-                if df.empty and not missing_authors:
-                    st.info("No papers found matching your criteria in the last year.")
-                elif df.empty and missing_authors:
-                    st.warning("No papers found, and some authors were not found at this university.")
+            university_id = university_ids
+            university_display_name = institution_registry.display_name(university_ids[0]) if len(university_ids) == 1 else None
+            # With several universities, papers are split between them locally
+            comparison_groups = selected_groups if len(selected_groups) > 1 else None
+            
+            # ALWAYS fetch 365 days (1 Year) to allow filtering later. The search
+            # runs in the background and replaces this session's running one;
+            # identical searches from other sessions are shared, not repeated.
+            search_params = dict(
+                university_id=university_id, author_names=author_names, days_back=365,
+                university_display_name=university_display_name, institution_groups=comparison_groups
+            )
+            submit_search(search_params, f"{len(author_names)} author(s) at {university}")
+
+# Background search status (polled on every rerun while it runs)
+search_job = get_job_manager().get(st.session_state['search_job_id']) if 'search_job_id' in st.session_state else None
+search_job_running = search_job is not None and not search_job.finished
+
+# This session's results live in the shared cache. If they were evicted or
+# have expired, search again in the background (finished lookups and stored
+# works make that quick), automatically once per results table so a table
+# too big for the cache isn't searched over and over.
+results_evicted = 'results_key' in st.session_state and load_shared_results() is None
+search_job_uncollected = search_job is not None and st.session_state.get('collected_job_id') != search_job.id
+if results_evicted and not search_job_uncollected and st.session_state.get('refreshed_key') != st.session_state['results_key']:
+    st.session_state['refreshed_key'] = st.session_state['results_key']
+    submit_search(st.session_state['search_params'], st.session_state['search_job_label'])
+    search_job = get_job_manager().get(st.session_state['search_job_id'])
+    search_job_running = True
+if search_job is not None and st.session_state.get('collected_job_id') != search_job.id:
+    job_state = search_job.snapshot()
+    if search_job_running:
+        progress = job_state['progress']
+        st.markdown(f"#### ⏳ Searching {st.session_state['search_job_label']} (fetching last 1 year)")
+        if progress.get('total_batches'):
+            st.progress(
+                progress['batches_done'] / progress['total_batches'],
+                text=f"Fetched {progress['pages_fetched']} page(s) of works "
+                     f"({progress['batches_done']}/{progress['total_batches']} batches done)"
+            )
+        elif progress.get('total'):
+            st.progress(
+                progress['resolved'] / progress['total'],
+                text=f"Resolved {progress['resolved']}/{progress['total']} author(s)"
+            )
+        else:
+            st.progress(0.0, text="Resolving authors...")
+        if st.button("Cancel search"):
+            search_job.cancel()
+        
+        # Papers are shown as they arrive (the newest few, kept up to date by
+        # the job); the final table replaces this preview
+        if job_state['preview_works']:
+            partial_df = build_results(job_state['preview_works'], get_vip_matcher())
+            st.caption(f"{job_state['papers_found']} paper(s) so far, newest shown first...")
+            st.dataframe(
+                partial_df[["Title", "Authors", "Date", "Journal"]],
+                use_container_width=True,
+                hide_index=True
+            )
+        if 'results_key' in st.session_state and not results_evicted:
+            st.caption("Results of your previous search are shown below until this one finishes.")
+    else:
+        # Collect the finished job once
+        st.session_state['collected_job_id'] = search_job.id
+        for message in job_state['warnings']:
+            st.warning(message)
+        if job_state['status'] == DONE:
+            result = job_state['result']
+            st.session_state['request_stats'] = search_job.stats.summary()
+            st.session_state['search_trace'] = search_job.stats
+            
+            # Store in session state. The table itself lives in the shared
+            # result cache; the session keeps its key and how to rebuild it.
+            st.session_state['results_key'] = result['key']
+            st.session_state['search_params'] = search_job.params
+            st.session_state['missing_authors'] = result['missing_authors']
+            st.session_state['has_searched'] = True
+            
+            if not result['papers'] and not result['missing_authors']:
+                st.info("No papers found matching your criteria in the last year.")
+            elif not result['papers'] and result['missing_authors']:
+                st.warning("No papers found, and some authors were not found at the selected institutions.")
+        elif job_state['status'] == CANCELLED:
+            st.info("Search cancelled. Authors and works fetched so far are kept, so searching again picks up where it stopped.")
+        else:
+            st.error(f"Search failed: {job_state['error']}")
 
 # Display Logic (Runs on every rerun if results exist)
 if 'has_searched' in st.session_state:
     
     # --- Top Dashboard: Successful Papers ---
     st.markdown("### 📚 Recent Publications")
+    if st.session_state.get('request_stats'):
+        st.caption(f"OpenAlex traffic for this search: {st.session_state['request_stats']}")
     
-    if 'results_df' in st.session_state and not st.session_state['results_df'].empty:
-        df_all = st.session_state['results_df']
+    results_df = load_shared_results() if 'results_key' in st.session_state else None
+    if results_df is not None and not results_df.empty:
+        df_all = results_df
         
-        # Filter based on current Time Horizon selection
+        # Rows in the current Time Horizon; cached per view, so reruns that
+        # only change the page don't filter or sort again
         days_back = time_horizon_options[time_horizon]
-        cutoff_date = (datetime.now() - timedelta(days=days_back)).strftime('%Y-%m-%d')
-        
-        # Ensure Date column is datetime or string comparable
-        # API returns ISO strings YYYY-MM-DD
-        df_filtered = df_all[df_all['Date'] >= cutoff_date]
+        horizon_positions = cached_view(df_all, days_back)
         
-        if not df_filtered.empty:
-            st.success(f"Found {len(df_filtered)} paper(s) published in the last {days_back} days!")
+        if len(horizon_positions):
+            st.success(f"Found {len(horizon_positions)} paper(s) published in the last {days_back} days!")
             
-            # Display table with clickable links
-            # Define highlight function
-            def highlight_vip(row):
-                if '_is_vip' in row and row['_is_vip']:
-                    return ['background-color: #FFF9C4'] * len(row)
-                return [''] * len(row)
+            sort_col, vip_col, size_col = st.columns([2, 1, 1])
+            with sort_col:
+                sort_choice = st.selectbox("Sort by", list(SORT_ORDERS), key='results_sort')
+            with vip_col:
+                vip_only = st.checkbox("VIP papers only", key='results_vip_only')
+            with size_col:
+                page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1, key='results_page_size')
             
-            # Apply styling
-            # Note: Styler object must be passed to st.dataframe
-            styled_df = df_filtered.style.apply(highlight_vip, axis=1)
-
-            # Display table with clickable links
-            st.dataframe(
-                styled_df,
-                use_container_width=True,
-                hide_index=True,
-                column_config={
-                    "Link": st.column_config.LinkColumn(
-                        "Link",
-                        display_text="View Paper",
-                        width="small"
-                    ),
-                    "Title": st.column_config.TextColumn(
-                        "Title",
-                        width="large"
-                    ),
-                    "Authors": st.column_config.TextColumn(
-                        "Authors",
-                        width="medium"
-                    ),
-                    "Date": st.column_config.TextColumn(
-                        "Date",
-                        width="small"
-                    ),
-                    "Journal": st.column_config.TextColumn(
-                        "Journal",
-                        width="medium"
-                    ),
-                    "_is_vip": None # Hide the helper column
-                }
+            # Refine within the results: keyword search and facet counts come
+            # from an index built once per search, not from rescanning the table
+            result_index = get_result_index(st.session_state['results_key'], df_all)
+            search_query = st.text_input(
+                "Search within results", placeholder="Words from titles, authors or journals", key='results_query'
             )
+            refine = {"query": search_query.strip()}
+            refine.update({
+                argument: tuple(st.session_state.get(f'results_facet_{facet}', []))
+                for facet, argument in FACETS.items()
+            })
+            facet_counts = result_index.facets(days_back=days_back, vip_only=vip_only, **refine)
+            for column, (facet, counts) in zip(st.columns(len(FACETS)), facet_counts.items()):
+                key = f'results_facet_{facet}'
+                with column:
+                    st.multiselect(
+                        facet,
+                        # Keep chosen values selectable even if no longer among the top counts
+                        options=list(dict.fromkeys(list(st.session_state.get(key, [])) + list(counts.index))),
+                        format_func=lambda value, counts=counts: f"{value} ({counts.get(value, 0)})",
+                        key=key
+                    )
+            
+            positions = cached_view(df_all, days_back, sort_choice, vip_only, refine)
+            if any(refine.values()) or vip_only:
+                st.caption(f"{len(positions)} paper(s) match the current filters.")
+            num_pages = max(1, math.ceil(len(positions) / page_size))
+            # A narrower view may have fewer pages than the one last shown
+            if st.session_state.get('results_page', 1) > num_pages:
+                st.session_state['results_page'] = 1
+            page_number = st.number_input(
+                f"Page (of {num_pages})", min_value=1, max_value=num_pages, step=1, key='results_page'
+            )
+            
+            render_started = time.perf_counter()
+            
+            # Only the visible page is sliced, styled and sent to the browser;
+            # VIP rows are highlighted for the whole page in one step
+            # (tuple helper columns feed search and the comparison matrix, not the table)
+            page_start = (page_number - 1) * page_size
+            page_df = df_all.take(positions[page_start:page_start + page_size]).drop(
+                columns=EXPORT_EXCLUDED_COLUMNS, errors="ignore"
+            )
+            if page_df.empty:
+                st.info("No papers match the current filters.")
+            else:
+                st.caption(f"Showing {page_start + 1}-{page_start + len(page_df)} of {len(positions)}")
+                # Note: Styler object must be passed to st.dataframe
+                styled_df = page_df.style.apply(vip_styles, axis=None)
+            
+                # Display table with clickable links
+                st.dataframe(
+                    styled_df,
+                    use_container_width=True,
+                    hide_index=True,
+                    column_config={
+                        "Link": st.column_config.LinkColumn(
+                            "Link",
+                            display_text="View Paper",
+                            width="small"
+                        ),
+                        "Title": st.column_config.TextColumn(
+                            "Title",
+                            width="large"
+                        ),
+                        "Authors": st.column_config.TextColumn(
+                            "Authors",
+                            width="medium"
+                        ),
+                        "Date": st.column_config.DateColumn(
+                            "Date",
+                            format="YYYY-MM-DD",
+                            width="small"
+                        ),
+                        "Journal": st.column_config.TextColumn(
+                            "Journal",
+                            width="medium"
+                        ),
+                        "_is_vip": None, # Hide the helper columns
+                        "_vip_authors": None,
+                        "_work_id": None
+                    }
+                )
+            st.session_state['render_seconds'] = time.perf_counter() - render_started
+            
+            # Multi-university searches: papers per author at each university in this window
+            comparison_groups = st.session_state['search_params'].get('institution_groups')
+            if comparison_groups:
+                st.markdown("### 🏛️ Authors by University")
+                matrix = institution_matrix(df_all.take(horizon_positions), list(comparison_groups))
+                st.caption(f"Papers per author at each university in the last {days_back} days.")
+                st.dataframe(matrix, use_container_width=True)
         else:
             st.info(f"No papers found in the last {days_back} days (but {len(df_all)} found in the last year).")
-    elif 'results_df' in st.session_state:
+    elif results_df is not None:
         st.info("No papers found matching the found authors.")
+    elif 'results_key' in st.session_state and not search_job_running:
+        st.warning("These results are no longer in the shared result cache.")
+        if st.button("Search again"):
+            submit_search(st.session_state['search_params'], st.session_state['search_job_label'])
+            st.rerun()
+
+    # --- What's New: papers since the last recorded run of this roster ---
+    if results_df is not None and not results_df.empty:
+        st.markdown("---")
+        st.markdown("### 🆕 What's New")
+        changes, last_run = cached_changes(results_df)
+        if last_run is None:
+            st.caption("No earlier run is recorded for this roster, so every paper counts as new. "
+                       "Mark the results as seen to track changes from here.")
+        else:
+            st.caption(f"Compared with the run recorded {last_run['run_at']} ({last_run['papers']} paper(s)).")
+        
+        if changes.empty:
+            st.info("Nothing new since the last recorded run.")
+        else:
+            change_counts = changes["Change"].value_counts()
+            st.write(f"{change_counts.get(NEW, 0)} new and {change_counts.get(CHANGED, 0)} changed paper(s).")
+            format_col, download_col = st.columns(2)
+            with format_col:
+                digest_format = st.selectbox("Digest format", DIGEST_FORMATS, key='digest_format')
+            with download_col:
+                st.download_button(
+                    "Download digest",
+                    data=cached_digest_file(changes, digest_format),
+                    file_name=f"chewie_digest_{datetime.now():%Y-%m-%d}.{digest_format}",
+                    mime=MIME_TYPES[digest_format],
+                    use_container_width=True
+                )
+        
+        if st.button("Mark these results as seen"):
+            search_params = st.session_state['search_params']
+            get_run_history().record(search_params['author_names'], search_params['university_id'], results_df, changes)
+            st.session_state.pop('digest', None)
+            st.success("Recorded. The next digest lists only papers that are new or changed after this run.")
+        
+        with st.expander("Run history", expanded=False):
+            search_params = st.session_state['search_params']
+            past_runs = get_run_history().runs(search_params['author_names'], search_params['university_id'])
+            if past_runs:
+                st.dataframe(pd.DataFrame(past_runs).drop(columns=["run_id"]), use_container_width=True, hide_index=True)
+            else:
+                st.caption("No runs recorded yet.")
 
     # --- Bottom Dashboard: Missing Authors ---
     if 'missing_authors' in st.session_state and st.session_state['missing_authors']:
@@ -471,11 +566,47 @@ if 'has_searched' in st.session_state:
         
         st.caption("Tip: Check the spelling or ensure they are affiliated with the selected university in OpenAlex.")
 
-elif 'has_searched' in st.session_state and st.session_state.get('results_df', pd.DataFrame()).empty:
+elif 'has_searched' in st.session_state and 'results_key' not in st.session_state:
     # already handled by the search block info message, but good for persistence state
     pass
 
 else:
-    if not search_button:
+    if not search_button and not search_job_running:
         st.info("👈 Use the sidebar to select a university and enter author names, then click 'Search' to find recent papers.")
 
+# Sidebar performance panel (phase timings for the last search, plus the full trace if recorded)
+search_trace = st.session_state.get('search_trace')
+if search_trace is not None:
+    with st.sidebar:
+        with st.expander("Performance", expanded=False):
+            phase_rows = [
+                {"Phase": name, "Seconds": round(seconds, 3)}
+                for name, seconds in search_trace.phases.items()
+            ]
+            if 'render_seconds' in st.session_state:
+                phase_rows.append({"Phase": "render_table (last rerun)", "Seconds": round(st.session_state['render_seconds'], 3)})
+            st.dataframe(pd.DataFrame(phase_rows), use_container_width=True, hide_index=True)
+            st.caption(st.session_state.get('request_stats', ''))
+            st.caption(f"Shared result cache: {get_result_cache().summary()}")
+            
+            if search_trace.tracing:
+                endpoint_rows = [
+                    dict(Endpoint=endpoint, **summary)
+                    for endpoint, summary in search_trace.request_summary().items()
+                ]
+                if endpoint_rows:
+                    st.dataframe(pd.DataFrame(endpoint_rows), use_container_width=True, hide_index=True)
+                st.download_button(
+                    "Export trace (JSON)",
+                    data=json.dumps(search_trace.to_dict(), indent=2),
+                    file_name="chewie_search_trace.json",
+                    mime="application/json",
+                    use_container_width=True
+                )
+            else:
+                st.caption("Enable 'Record performance trace' before searching to capture per-request details.")
+
+# Poll the running search; any widget change interrupts the wait and reruns at once
+if search_job_running:
+    time.sleep(1.0)
+    st.rerun()
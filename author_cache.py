@@ -0,0 +1,153 @@
+"""
+On-disk cache of author-name -> OpenAlex author ID lookups.
+
+Entries are keyed on (normalized name, institution set) and hold the matched
+author IDs. An empty ID list is a negative ("missing") result and is cached
+too, with its own (shorter) TTL. Lookups that only hold for some searches
+(such as names matched on one time window's works) go under a named scope
+of the institution set. The cache is a SQLite file (see sqlite_store), so
+several Streamlit sessions/processes can read and write it at once.
+"""
+import json
+import os
+import threading
+import time
+import unicodedata
+
+from sqlite_store import CACHE_DIR, QUERY_BATCH, SQLiteStore, institutions_key
+
+# How long (seconds) resolved and missing names stay valid
+AUTHOR_CACHE_TTL = int(os.environ.get("CHEWIE_AUTHOR_CACHE_TTL", 7 * 24 * 3600))
+MISSING_AUTHOR_CACHE_TTL = int(os.environ.get("CHEWIE_MISSING_AUTHOR_CACHE_TTL", 24 * 3600))
+
+
+def normalize_name(name):
+    """Case-folds, NFKC-normalizes and collapses whitespace in a name."""
+    return " ".join(unicodedata.normalize("NFKC", name).casefold().split())
+
+
+def _scoped_key(institution_ids, scope=None):
+    inst_key = institutions_key(institution_ids)
+    return f"{inst_key}#{scope}" if scope else inst_key
+
+
+class AuthorCache(SQLiteStore):
+    """SQLite-backed author lookup cache. Safe to share across threads."""
+
+    def __init__(self, path=None, ttl=AUTHOR_CACHE_TTL, missing_ttl=MISSING_AUTHOR_CACHE_TTL):
+        super().__init__(path or os.path.join(CACHE_DIR, "authors.sqlite"))
+        self.ttl = ttl
+        self.missing_ttl = missing_ttl
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS author_ids (
+                    name TEXT NOT NULL,
+                    institutions TEXT NOT NULL,
+                    author_ids TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (name, institutions)
+                )
+                """
+            )
+
+    def _is_fresh(self, author_ids, fetched_at, now):
+        ttl = self.ttl if author_ids else self.missing_ttl
+        return now - fetched_at < ttl
+
+    def get(self, name, institution_ids, scope=None):
+        """Returns the cached ID list for a name, or None on a miss/expired entry."""
+        return self.get_many([name], institution_ids, scope).get(name)
+
+    def get_many(self, names, institution_ids, scope=None):
+        """
+        Bulk lookup. Returns {input name: [author IDs]} for every name with a
+        fresh entry; names that are missing or expired are left out. With a
+        scope, only entries stored under that scope are read.
+        """
+        inst_key = _scoped_key(institution_ids, scope)
+        by_normalized = {}
+        for name in names:
+            by_normalized.setdefault(normalize_name(name), []).append(name)
+
+        found = {}
+        now = time.time()
+        keys = list(by_normalized)
+        conn = self._connect()
+        for i in range(0, len(keys), QUERY_BATCH):
+            batch = keys[i:i + QUERY_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT name, author_ids, fetched_at FROM author_ids "
+                f"WHERE institutions = ? AND name IN ({placeholders})",
+                [inst_key] + batch,
+            ).fetchall()
+            for norm_name, ids_json, fetched_at in rows:
+                author_ids = json.loads(ids_json)
+                if not self._is_fresh(author_ids, fetched_at, now):
+                    continue
+                for name in by_normalized[norm_name]:
+                    found[name] = author_ids
+        return found
+
+    def set(self, name, institution_ids, author_ids, scope=None):
+        """Stores a lookup result. Pass an empty list to record a missing author."""
+        self.set_many({name: author_ids}, institution_ids, scope)
+
+    def set_many(self, results, institution_ids, scope=None):
+        """Stores {name: [author IDs]} for one institution set (and scope) in a single transaction."""
+        inst_key = _scoped_key(institution_ids, scope)
+        now = time.time()
+        rows = [
+            (normalize_name(name), inst_key, json.dumps(list(ids)), now)
+            for name, ids in results.items()
+        ]
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO author_ids (name, institutions, author_ids, fetched_at) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def invalidate(self, name=None, institution_ids=None):
+        """
+        Drops cache entries. With no arguments everything is cleared;
+        otherwise only entries matching the given name and/or institution set
+        (in any scope). Returns the number of entries removed.
+        """
+        clauses, args = [], []
+        if name is not None:
+            clauses.append("name = ?")
+            args.append(normalize_name(name))
+        if institution_ids is not None:
+            inst_key = institutions_key(institution_ids)
+            clauses.append("(institutions = ? OR substr(institutions, 1, ?) = ?)")
+            args.extend([inst_key, len(inst_key) + 1, inst_key + "#"])
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            return conn.execute(f"DELETE FROM author_ids{where}", args).rowcount
+
+    def purge_expired(self):
+        """Deletes entries past their TTL. Returns the number removed."""
+        now = time.time()
+        with self._connect() as conn:
+            return conn.execute(
+                "DELETE FROM author_ids WHERE "
+                "(author_ids != '[]' AND fetched_at < ?) OR (author_ids = '[]' AND fetched_at < ?)",
+                (now - self.ttl, now - self.missing_ttl),
+            ).rowcount
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_author_cache():
+    """Returns the process-wide AuthorCache instance."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = AuthorCache()
+        return _default_cache
@@ -0,0 +1,166 @@
+"""
+Offline end-to-end benchmark of get_recent_papers against mock_openalex.
+
+For each roster size a synthetic dataset is served by a local mock server,
+and the search runs twice in a fresh worker process: "cold" (empty caches)
+and "warm" (author cache and works store populated by the cold run). Reports
+the query plan chosen, wall time per pipeline phase (including planning and
+the institution-first plan's works stream), client and server request
+counts, and peak RSS.
+
+    python benchmark.py                         # rosters of 10, 100 and 1,000
+    python benchmark.py --sizes 100 --latency 0.05 --error-rate 0.02
+    python benchmark.py --save baseline.json
+    python benchmark.py --compare baseline.json # exits 1 on a regression
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from mock_openalex import MockOpenAlex, make_dataset
+
+PHASES = ("plan", "fetch_institution_works", "resolve_authors", "fetch_works", "merge_store", "build_results")
+INSTITUTION_IDS = ["I95457486"]
+
+
+def _run_search(base_url, cache_dir, roster, days_back, rate):
+    """Runs in a spawned worker so caches, env and peak memory start clean."""
+    os.environ["OPENALEX_API_BASE"] = base_url
+    os.environ["CHEWIE_CACHE_DIR"] = cache_dir
+
+    import openalex_client
+    from search_engine import get_recent_papers
+
+    openalex_client.set_rate_limit(rate)
+    stats = openalex_client.RequestStats()
+    warnings = []
+    started = time.perf_counter()
+    df, missing = get_recent_papers(
+        INSTITUTION_IDS, roster, days_back=days_back, stats=stats, on_warning=warnings.append
+    )
+    wall = time.perf_counter() - started
+
+    try:
+        import resource
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:  # not available on Windows
+        peak_rss_mb = None
+
+    return {
+        "wall_seconds": wall,
+        "plan": stats.plan,
+        "phases": {name: stats.phases.get(name, 0.0) for name in PHASES},
+        "requests": stats.requests,
+        "retries": stats.retries,
+        "megabytes": stats.bytes_received / 1e6,
+        "papers": len(df),
+        "missing_authors": len(missing),
+        "warnings": len(warnings),
+        "peak_rss_mb": peak_rss_mb,
+    }
+
+
+def run_benchmarks(sizes, latency=0.0, error_rate=0.0, max_per_page=200, rate=1000.0,
+                   works_per_author=6, days_back=365):
+    """Returns one result dict per (size, pass)."""
+    results = []
+    context = multiprocessing.get_context("spawn")
+    server = MockOpenAlex({}, latency=latency, error_rate=error_rate, max_per_page=max_per_page).start()
+    try:
+        for size in sizes:
+            dataset, roster = make_dataset(size, works_per_author=works_per_author,
+                                           institution_ids=INSTITUTION_IDS, days=days_back)
+            server.load(dataset)
+            cache_dir = tempfile.mkdtemp(prefix="chewie-bench-")
+            try:
+                for pass_name in ("cold", "warm"):
+                    server.reset_counts()
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                        result = executor.submit(
+                            _run_search, server.base_url, cache_dir, roster, days_back, rate
+                        ).result()
+                    result.update({
+                        "size": size,
+                        "pass": pass_name,
+                        "server_requests": dict(server.request_counts),
+                    })
+                    results.append(result)
+            finally:
+                shutil.rmtree(cache_dir, ignore_errors=True)
+    finally:
+        server.stop()
+    return results
+
+
+def print_report(results):
+    widths = {name: max(15, len(name)) for name in PHASES}
+    header = f"{'authors':>7} {'pass':<5} {'plan':<11} {'wall s':>7} " + " ".join(
+        f"{name:>{widths[name]}}" for name in PHASES
+    ) + f" {'requests':>8} {'retries':>7} {'MB':>6} {'papers':>7} {'RSS MB':>7}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "n/a"
+        print(
+            f"{r['size']:>7} {r['pass']:<5} {r.get('plan') or 'n/a':<11} {r['wall_seconds']:>7.2f} "
+            + " ".join(f"{r['phases'][name]:>{widths[name]}.3f}" for name in PHASES)
+            + f" {r['requests']:>8} {r['retries']:>7} {r['megabytes']:>6.1f} {r['papers']:>7} {rss:>7}"
+        )
+
+
+def find_regressions(results, baseline, tolerance):
+    """Lists (size, pass, metric, old, new) where wall time or request count grew past tolerance."""
+    previous = {(r["size"], r["pass"]): r for r in baseline}
+    regressions = []
+    for r in results:
+        old = previous.get((r["size"], r["pass"]))
+        if not old:
+            continue
+        for metric in ("wall_seconds", "requests"):
+            if r[metric] > old[metric] * (1 + tolerance) and r[metric] - old[metric] > 0.05:
+                regressions.append((r["size"], r["pass"], metric, old[metric], r[metric]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of the Chewie search pipeline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="roster sizes")
+    parser.add_argument("--latency", type=float, default=0.02, help="mock server latency per request (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 429/500")
+    parser.add_argument("--max-per-page", type=int, default=200, help="mock server page size cap")
+    parser.add_argument("--works-per-author", type=int, default=6)
+    parser.add_argument("--rate", type=float, default=1000.0, help="client request rate limit (req/s)")
+    parser.add_argument("--save", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON from --save; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown for --compare")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        args.sizes, latency=args.latency, error_rate=args.error_rate, max_per_page=args.max_per_page,
+        rate=args.rate, works_per_author=args.works_per_author,
+    )
+    print_report(results)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for size, pass_name, metric, old, new in regressions:
+            print(f"REGRESSION {size} authors ({pass_name}): {metric} {old:.2f} -> {new:.2f}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""
+Headless batch runner for Chewie searches.
+
+Runs every job in a manifest across a pool of worker processes and writes
+one results file (plus a missing-authors file) per job:
+
+    python chewie_cli.py jobs.csv --out-dir results --format parquet --workers 4
+
+The manifest is a CSV with the columns `university`, `roster` and `horizon`
+(or a JSON list of objects with the same keys). `university` is an
+institution group from the local registry (e.g. "UC Berkeley"), an OpenAlex
+institution ID, or several IDs joined with "|" (several universities
+separated by ";" are searched in one run and compared, with an extra
+`<name>_matrix.csv` of papers per author at each); `roster` a path to an .xlsx/.xls/.csv/.tsv/.txt file of names
+(relative paths are resolved against the manifest's folder), and `horizon`
+either a number of days or a label such as "3 Months". Optional columns:
+`name` names the output files, `column` is the 0-based roster column holding
+the names (default 0).
+
+With --digest csv|xlsx|json, each job also writes `<name>_digest.<format>`
+with only the papers that are new or changed since that roster's last run
+(run history is kept in the cache directory), which suits a nightly job.
+
+All workers share one OpenAlex request budget: each process gets an equal
+slice of --rate requests per second. With --snapshot INDEX_DIR the searches
+run against a local snapshot index (see snapshot_index.py) instead of the API.
+"""
+import argparse
+import csv
+import importlib.util
+import json
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import openalex_client
+from digest import DIGEST_FORMATS, write_digest
+from roster import read_roster
+from institution_registry import get_institution_registry
+from results_table import EXPORT_EXCLUDED_COLUMNS, institution_matrix
+from run_history import get_run_history
+from search_engine import TIME_HORIZON_DAYS, get_recent_papers
+
+logger = logging.getLogger("chewie")
+
+OUTPUT_FORMATS = ("csv", "parquet")
+
+
+def parse_horizon(value):
+    """Accepts a number of days or a TIME_HORIZON_DAYS label."""
+    value = str(value).strip()
+    if value in TIME_HORIZON_DAYS:
+        return TIME_HORIZON_DAYS[value]
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(
+            f"Unknown horizon {value!r}; use a number of days or one of {', '.join(TIME_HORIZON_DAYS)}"
+        ) from None
+
+
+def read_manifest(path):
+    """Loads and validates the job list. Raises ValueError on a bad entry."""
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            rows = json.load(f)
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    registry = get_institution_registry()
+    jobs = []
+    for line, row in enumerate(rows, start=1):
+        university = (row.get("university") or "").strip()
+        groups = {}
+        for selector in university.split(";"):
+            selector = selector.strip()
+            try:
+                groups[selector] = registry.resolve(selector)
+            except KeyError:
+                raise ValueError(f"Job {line}: unknown university {selector!r}") from None
+        roster = os.path.join(base_dir, (row.get("roster") or "").strip())
+        if not os.path.isfile(roster):
+            raise ValueError(f"Job {line}: roster file not found: {roster}")
+        horizon = parse_horizon(row.get("horizon") or 365)
+        try:
+            column = int(row.get("column") or 0)
+        except ValueError:
+            raise ValueError(f"Job {line}: column must be a number, got {row.get('column')!r}") from None
+        name = (row.get("name") or "").strip() or (
+            f"{university}__{os.path.splitext(os.path.basename(roster))[0]}"
+        )
+        jobs.append({
+            "name": re.sub(r"[^\w.-]+", "_", name),
+            "university": university,
+            "institution_ids": list(dict.fromkeys(i for ids in groups.values() for i in ids)),
+            "institution_groups": groups if len(groups) > 1 else None,
+            "roster": roster,
+            "horizon": horizon,
+            "column": column,
+        })
+    return jobs
+
+
+def _init_worker(requests_per_second, snapshot_dir=None):
+    openalex_client.set_rate_limit(requests_per_second)
+    if snapshot_dir:
+        from snapshot_index import SnapshotIndex
+        openalex_client.set_backend(SnapshotIndex(snapshot_dir))
+
+
+def run_job(job, out_dir, output_format, plan="auto", digest_format=None):
+    """
+    Runs one search in a worker process and writes its output files. With
+    digest_format, also writes a digest of the papers new or changed since
+    the job's last recorded run, and records this run.
+    """
+    started = time.perf_counter()
+    warnings = []
+    authors = read_roster(job["roster"], column=job["column"])
+    stats = openalex_client.RequestStats()
+    df, missing_authors = get_recent_papers(
+        job["institution_ids"],
+        authors,
+        days_back=job["horizon"],
+        stats=stats,
+        on_warning=warnings.append,
+        plan=plan,
+        institution_groups=job["institution_groups"],
+    )
+
+    results_path = os.path.join(out_dir, f"{job['name']}.{output_format}")
+    # Tuple helper columns stay out of the file (affiliations go to the matrix file)
+    df_out = df.drop(columns=EXPORT_EXCLUDED_COLUMNS, errors="ignore")
+    if output_format == "parquet":
+        df_out.to_parquet(results_path, index=False)
+    else:
+        df_out.to_csv(results_path, index=False)
+    missing_path = os.path.join(out_dir, f"{job['name']}_missing.csv")
+    pd.DataFrame(missing_authors, columns=["Author Name"]).to_csv(missing_path, index=False)
+    if job["institution_groups"]:
+        matrix = institution_matrix(df, list(job["institution_groups"]))
+        matrix.to_csv(os.path.join(out_dir, f"{job['name']}_matrix.csv"), index_label="Author")
+
+    new_papers = None
+    if digest_format:
+        history = get_run_history()
+        changes, _ = history.changes(authors, job["institution_ids"], df)
+        with open(os.path.join(out_dir, f"{job['name']}_digest.{digest_format}"), "wb") as f:
+            write_digest(changes, f, digest_format, title=job["name"])
+        history.record(authors, job["institution_ids"], df, changes)
+        new_papers = len(changes)
+
+    return {
+        "name": job["name"],
+        "authors": len(authors),
+        "papers": len(df),
+        "missing": len(missing_authors),
+        "new_papers": new_papers,
+        "warnings": warnings,
+        "requests": stats.summary(),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Chewie searches from a job manifest.")
+    parser.add_argument("manifest", help="CSV or JSON job manifest")
+    parser.add_argument("--out-dir", default="results", help="where to write result files (default: results)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="csv", help="results file format")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="number of worker processes")
+    parser.add_argument("--plan", choices=("auto", "author", "institution"), default="auto",
+                        help="query plan: search each author, stream the institution's works, or pick by cost")
+    parser.add_argument("--rate", type=float, default=openalex_client.MAX_REQUESTS_PER_SECOND,
+                        help="total OpenAlex requests per second shared by all workers")
+    parser.add_argument("--snapshot", metavar="INDEX_DIR",
+                        help="answer queries from a local snapshot index instead of the OpenAlex API")
+    parser.add_argument("--digest", choices=DIGEST_FORMATS,
+                        help="also write <name>_digest.<format> with papers new or changed since the job's last run")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    try:
+        jobs = read_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if args.format == "parquet" and not any(
+        importlib.util.find_spec(engine) for engine in ("pyarrow", "fastparquet")
+    ):
+        parser.error("--format parquet needs pyarrow or fastparquet installed")
+    if args.snapshot and not os.path.exists(os.path.join(args.snapshot, "manifest.json")):
+        parser.error(f"{args.snapshot} is not a snapshot index (no manifest.json)")
+    if not jobs:
+        logger.info("Manifest has no jobs.")
+        return 0
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    workers = max(1, min(args.workers, len(jobs)))
+    failures = 0
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(args.rate / workers, args.snapshot)
+    ) as executor:
+        futures = {
+            executor.submit(run_job, job, args.out_dir, args.format, args.plan, args.digest): job for job in jobs
+        }
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                summary = future.result()
+            except Exception:
+                failures += 1
+                logger.exception("Job %s failed", job["name"])
+                continue
+            for warning in summary["warnings"]:
+                logger.warning("%s: %s", summary["name"], warning)
+            logger.info(
+                "%s: %d paper(s), %d/%d author(s) missing, %.1fs, %s",
+                summary["name"], summary["papers"], summary["missing"], summary["authors"],
+                summary["seconds"], summary["requests"],
+            )
+            if summary["new_papers"] is not None:
+                logger.info("%s: %d new or changed paper(s) since the last run", summary["name"], summary["new_papers"])
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Shared pytest fixtures: a mock_openalex server over a synthetic roster with
+one 150-author consortium paper, and empty caches for each test.
+"""
+import itertools
+from datetime import date, timedelta
+
+import pytest
+
+import author_cache
+import openalex_client
+import search_engine
+import works_store
+from mock_openalex import OPENALEX_PREFIX, MockOpenAlex, make_dataset
+
+INSTITUTION_IDS = ["I95457486"]
+DAYS_BACK = 365
+
+
+def _consortium_work(roster_author):
+    # A 150-author paper with `roster_author` listed 121st, past the 100
+    # authorships OpenAlex lists in search results
+    home = {"id": OPENALEX_PREFIX + INSTITUTION_IDS[0]}
+    members = [
+        {"author": {"id": f"{OPENALEX_PREFIX}A{8000000000 + n}", "display_name": f"Member{n} Consortium"},
+         "institutions": [{"id": OPENALEX_PREFIX + "I999999999"}]}
+        for n in range(149)
+    ]
+    roster_authorship = {
+        "author": {"id": roster_author["id"], "display_name": roster_author["display_name"]},
+        "institutions": [home],
+    }
+    return {
+        "id": OPENALEX_PREFIX + "W9000000001",
+        "display_name": "Consortium paper",
+        "publication_date": (date.today() - timedelta(days=10)).isoformat(),
+        "doi": "https://doi.org/10.5555/consortium",
+        "primary_location": {"landing_page_url": "https://example.org/consortium",
+                             "source": {"display_name": "Nature"}},
+        "authorships": members[:120] + [roster_authorship] + members[120:],
+    }
+
+
+@pytest.fixture(scope="session")
+def fixture_data():
+    """(dataset, roster names, name of the roster author on the consortium paper)"""
+    dataset, roster = make_dataset(40, institution_ids=INSTITUTION_IDS, days=DAYS_BACK)
+    home = OPENALEX_PREFIX + INSTITUTION_IDS[0]
+    roster_author = next(
+        author for author in dataset["authors"]
+        if author["display_name"] in roster
+        and any(inst["id"] == home for inst in author["last_known_institutions"])
+    )
+    dataset["works"].append(_consortium_work(roster_author))
+    return dataset, roster, roster_author["display_name"]
+
+
+@pytest.fixture(scope="session")
+def server(fixture_data):
+    with MockOpenAlex(fixture_data[0]) as mock:
+        yield mock
+
+
+@pytest.fixture
+def fresh_caches(tmp_path, monkeypatch):
+    """Empty author cache and works store, so each search starts cold; call it to start over."""
+    counter = itertools.count()
+
+    def reset():
+        directory = tmp_path / f"cache-{next(counter)}"
+        monkeypatch.setattr(author_cache, "_default_cache", author_cache.AuthorCache(str(directory / "authors.sqlite")))
+        monkeypatch.setattr(works_store, "_default_store", works_store.WorksStore(str(directory / "works.sqlite")))
+    reset()
+    return reset
+
+
+@pytest.fixture
+def api(server, monkeypatch):
+    """Points the search engine at the mock server."""
+    monkeypatch.setattr(search_engine, "AUTHORS_URL", f"{server.base_url}/authors")
+    monkeypatch.setattr(search_engine, "WORKS_URL", f"{server.base_url}/works")
+    monkeypatch.setattr(openalex_client, "_limiter", openalex_client.AdaptiveLimiter(1000))
+    return server
+
+
+@pytest.fixture
+def search(api, fresh_caches):
+    """search(roster, plan, stats=None) -> (df, missing) against the mock server."""
+    def run(roster, plan="auto", stats=None):
+        return search_engine.get_recent_papers(INSTITUTION_IDS, roster, DAYS_BACK, plan=plan, stats=stats)
+    return run
@@ -0,0 +1,75 @@
+"""
+Streaming export of "what's new" digests.
+
+A digest is the frame returned by RunHistory.changes: only the papers new
+or changed since the last recorded run. Writers emit it row by row (CSV
+through the csv module, XLSX through openpyxl's write-only mode, JSON as
+one object per paper inside an array), so a digest never needs a second
+in-memory copy in another format.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+DIGEST_FORMATS = ("csv", "xlsx", "json")
+
+# Digest columns, from the results frame's columns
+DIGEST_COLUMNS = {
+    "Change": "Change",
+    "Title": "Title",
+    "Authors": "Authors",
+    "Date": "Date",
+    "Journal": "Journal",
+    "Link": "Link",
+    "VIP Authors": "_vip_authors",
+}
+
+MIME_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "json": "application/json",
+}
+
+
+def digest_rows(changes):
+    """Yields each digest paper as a tuple of strings (dates as YYYY-MM-DD)."""
+    dates = changes["Date"].dt.strftime('%Y-%m-%d')
+    columns = [dates if name == "Date" else changes[source] for name, source in DIGEST_COLUMNS.items()]
+    for values in zip(*columns):
+        yield tuple("" if value is None or value != value else str(value) for value in values)  # NaN != NaN
+
+
+def write_digest(changes, out, fmt="csv", title="Chewie digest"):
+    """Writes a digest to the binary file object `out` in one of DIGEST_FORMATS."""
+    if fmt == "csv":
+        text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+        writer = csv.writer(text)
+        writer.writerow(DIGEST_COLUMNS)
+        writer.writerows(digest_rows(changes))
+        text.flush()
+        text.detach()
+    elif fmt == "json":
+        header = {"title": title, "generated": datetime.now().isoformat(timespec="seconds"), "count": len(changes)}
+        out.write(json.dumps(header, ensure_ascii=False)[:-1].encode("utf-8") + b', "papers": [')
+        for number, row in enumerate(digest_rows(changes)):
+            paper = dict(zip(DIGEST_COLUMNS, row))
+            out.write((",\n" if number else "\n").encode("utf-8") + json.dumps(paper, ensure_ascii=False).encode("utf-8"))
+        out.write(b"\n]}\n")
+    elif fmt == "xlsx":
+        import openpyxl
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet(title[:31])
+        sheet.append(list(DIGEST_COLUMNS))
+        for row in digest_rows(changes):
+            sheet.append(row)
+        workbook.save(out)
+    else:
+        raise ValueError(f"Unknown digest format {fmt!r}; use one of {', '.join(DIGEST_FORMATS)}")
+
+
+def digest_bytes(changes, fmt="csv", title="Chewie digest"):
+    """The digest file's contents, e.g. for a download button."""
+    out = io.BytesIO()
+    write_digest(changes, out, fmt, title)
+    return out.getvalue()
@@ -0,0 +1,391 @@
+"""
+Local registry of OpenAlex institutions with type-ahead search.
+
+Institutions are stored in a SQLite file next to the other caches and can be
+bulk-loaded from an OpenAlex snapshot (institutions/*/part_*.gz, one JSON
+record per line) or from saved /institutions API pages. Searching never
+touches the network: an in-memory index over names, acronyms and alternative
+names answers prefix queries with a binary search over sorted tokens and
+falls back to trigram overlap for typos and mid-word fragments.
+
+Groups are named bundles of institutions searched together (for example
+UC Berkeley + Lawrence Berkeley National Lab). The built-in bundles are
+always available, even before anything has been loaded.
+
+    python institution_registry.py load snapshot/institutions/*/part_*.gz
+    python institution_registry.py fetch --country US    # cache API pages, then load them
+    python institution_registry.py search "berkeley lab"
+"""
+import argparse
+import bisect
+import glob
+import gzip
+import heapq
+import json
+import os
+import re
+import sys
+import threading
+import unicodedata
+
+from sqlite_store import CACHE_DIR, SQLiteStore, institutions_key
+from openalex_client import INSTITUTIONS_URL, get_json
+
+# Named bundles offered out of the box, and what they search
+DEFAULT_GROUPS = {
+    "UC Berkeley": ["I95457486", "I148283060"],   # UC Berkeley + Lawrence Berkeley National Lab
+    "UC Berkeley & UCSF": ["I95457486", "I148283060", "I180670191"], # UC Berkeley + LBL + UCSF
+    "Stanford": ["I4200000001"],    # Stanford University
+    "MIT": ["I127595847"],          # Massachusetts Institute of Technology
+    "Harvard": ["I136199984"]       # Harvard University
+}
+
+# Minimal records for the built-in bundles, so they have names before a load
+SEED_INSTITUTIONS = [
+    {"id": "I95457486", "display_name": "University of California, Berkeley", "acronyms": ["UCB"]},
+    {"id": "I148283060", "display_name": "Lawrence Berkeley National Laboratory", "acronyms": ["LBNL"]},
+    {"id": "I180670191", "display_name": "University of California, San Francisco", "acronyms": ["UCSF"]},
+    {"id": "I4200000001", "display_name": "Stanford University"},
+    {"id": "I127595847", "display_name": "Massachusetts Institute of Technology", "acronyms": ["MIT"]},
+    {"id": "I136199984", "display_name": "Harvard University"},
+]
+
+# Fields requested when caching API pages
+INSTITUTION_FIELDS = (
+    "id", "display_name", "display_name_acronyms", "display_name_alternatives",
+    "country_code", "type", "works_count", "associated_institutions",
+)
+
+# Relationships (from associated_institutions) that count as children
+CHILD_RELATIONSHIPS = ("child",)
+
+_INSERT_BATCH = 5000
+
+
+def fold(text):
+    """Lower-cases and strips accents and punctuation for matching."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(re.findall(r"\w+", stripped.casefold()))
+
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def short_institution_id(value):
+    """'https://openalex.org/I95457486' -> 'I95457486'."""
+    return (value or "").rstrip("/").rsplit("/", 1)[-1]
+
+
+def _record_row(record):
+    # Accepts snapshot/API records and the seed shorthand
+    institution_id = short_institution_id(record.get("id"))
+    acronyms = record.get("display_name_acronyms") or record.get("acronyms") or []
+    alternatives = record.get("display_name_alternatives") or []
+    children = [
+        short_institution_id(related.get("id"))
+        for related in record.get("associated_institutions") or []
+        if related.get("relationship") in CHILD_RELATIONSHIPS and related.get("id")
+    ]
+    return (
+        institution_id,
+        record.get("display_name") or institution_id,
+        json.dumps(acronyms),
+        json.dumps(alternatives),
+        record.get("country_code"),
+        record.get("type"),
+        int(record.get("works_count") or 0),
+        json.dumps(children),
+    )
+
+
+def iter_institution_records(path):
+    """
+    Yields institution records from a saved API page (.json holding
+    {"results": [...]}) or a snapshot part (JSON lines, optionally .gz).
+    """
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            yield from json.load(f).get("results", [])
+        return
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class InstitutionRegistry(SQLiteStore):
+    """SQLite-backed institution registry with an in-memory search index."""
+
+    def __init__(self, path=None):
+        super().__init__(path or os.path.join(CACHE_DIR, "institutions.sqlite"))
+        self._index = None
+        self._index_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS institutions (
+                    id TEXT PRIMARY KEY,
+                    display_name TEXT NOT NULL,
+                    acronyms TEXT NOT NULL,
+                    alternatives TEXT NOT NULL,
+                    country_code TEXT,
+                    type TEXT,
+                    works_count INTEGER NOT NULL,
+                    children TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS institution_groups (
+                    name TEXT PRIMARY KEY,
+                    institution_ids TEXT NOT NULL
+                );
+                """
+            )
+            # Seeds never overwrite fuller records from a load
+            conn.executemany(
+                "INSERT OR IGNORE INTO institutions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [_record_row(record) for record in SEED_INSTITUTIONS],
+            )
+
+    def load(self, records):
+        """Upserts institution records (snapshot or API format). Returns how many."""
+        count = 0
+        batch = []
+        with self._connect() as conn:
+            for record in records:
+                if not record.get("id"):
+                    continue
+                batch.append(_record_row(record))
+                if len(batch) >= _INSERT_BATCH:
+                    conn.executemany("INSERT OR REPLACE INTO institutions VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                    count += len(batch)
+                    batch = []
+            conn.executemany("INSERT OR REPLACE INTO institutions VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+            count += len(batch)
+        with self._index_lock:
+            self._index = None
+        return count
+
+    def load_files(self, paths):
+        """Loads every snapshot part / API page in `paths`. Returns how many records."""
+        return sum(self.load(iter_institution_records(path)) for path in paths)
+
+    def _build_index(self):
+        rows = self._connect().execute(
+            "SELECT id, display_name, acronyms, alternatives, country_code, type, works_count, children "
+            "FROM institutions"
+        ).fetchall()
+        entries = []
+        exact_names = []
+        token_postings = {}
+        for institution_id, display_name, acronyms, alternatives, country_code, kind, works_count, children in rows:
+            position = len(entries)
+            acronyms = json.loads(acronyms)
+            entries.append({
+                "id": institution_id,
+                "display_name": display_name,
+                "acronyms": acronyms,
+                "country_code": country_code,
+                "type": kind,
+                "works_count": works_count,
+                "children": json.loads(children),
+            })
+            folded_names = {fold(name) for name in [display_name] + acronyms + json.loads(alternatives)}
+            exact_names.append(folded_names)
+            for token in {token for name in folded_names for token in name.split()}:
+                token_postings.setdefault(token, set()).add(position)
+
+        # Sorted tokens answer prefix queries by bisection; trigrams catch the rest
+        tokens = sorted(token_postings)
+        by_trigram = {}
+        for token_index, token in enumerate(tokens):
+            for gram in trigrams(token):
+                by_trigram.setdefault(gram, []).append(token_index)
+        return {
+            "entries": entries,
+            "exact_names": exact_names,
+            "by_id": {entry["id"]: position for position, entry in enumerate(entries)},
+            "tokens": tokens,
+            "postings": [token_postings[token] for token in tokens],
+            "by_trigram": by_trigram,
+        }
+
+    def _get_index(self):
+        with self._index_lock:
+            if self._index is None:
+                self._index = self._build_index()
+            return self._index
+
+    def _match_token(self, index, query_token):
+        # Institutions with a name token starting with query_token; if there
+        # are none, those sharing most trigrams with it
+        tokens = index["tokens"]
+        start = bisect.bisect_left(tokens, query_token)
+        matched = set()
+        position = start
+        while position < len(tokens) and tokens[position].startswith(query_token):
+            matched |= index["postings"][position]
+            position += 1
+        if matched or len(query_token) < 3:
+            return matched
+
+        overlap = {}
+        query_grams = trigrams(query_token)
+        for gram in query_grams:
+            for token_index in index["by_trigram"].get(gram, ()):
+                overlap[token_index] = overlap.get(token_index, 0) + 1
+        threshold = max(2, len(query_grams) // 2)
+        for token_index, shared in overlap.items():
+            if shared >= threshold:
+                matched |= index["postings"][token_index]
+        return matched
+
+    def search(self, query, limit=20):
+        """
+        Type-ahead search over names, acronyms and alternative names. Every
+        query word must match; exact name/acronym matches come first, then
+        the rest by works count. Returns institution dicts.
+        """
+        index = self._get_index()
+        query_tokens = fold(query).split()
+        if not query_tokens:
+            return []
+        candidates = None
+        for query_token in query_tokens:
+            matched = self._match_token(index, query_token)
+            candidates = matched if candidates is None else candidates & matched
+            if not candidates:
+                return []
+        folded_query = " ".join(query_tokens)
+        entries = index["entries"]
+
+        def rank(position):
+            entry = entries[position]
+            return (folded_query not in index["exact_names"][position], -entry["works_count"], entry["display_name"])
+
+        return [entries[position] for position in heapq.nsmallest(limit, candidates, key=rank)]
+
+    def get(self, institution_id):
+        """Returns the institution dict for an ID, or None if unknown."""
+        index = self._get_index()
+        position = index["by_id"].get(short_institution_id(institution_id))
+        return index["entries"][position] if position is not None else None
+
+    def display_name(self, institution_id):
+        entry = self.get(institution_id)
+        return entry["display_name"] if entry else institution_id
+
+    def children(self, institution_ids):
+        """IDs of institutions recorded as children of any of `institution_ids`."""
+        found = []
+        for institution_id in institution_ids:
+            entry = self.get(institution_id)
+            if entry:
+                found.extend(entry["children"])
+        return [child for child in dict.fromkeys(found) if child not in institution_ids]
+
+    def groups(self):
+        """{group name: [institution IDs]}: the built-in bundles plus saved ones."""
+        groups = dict(DEFAULT_GROUPS)
+        for name, institution_ids in self._connect().execute(
+            "SELECT name, institution_ids FROM institution_groups ORDER BY name"
+        ):
+            groups[name] = json.loads(institution_ids)
+        return groups
+
+    def save_group(self, name, institution_ids):
+        """Saves (or replaces) a named bundle of institutions."""
+        ids = [short_institution_id(i) for i in institution_ids]
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO institution_groups (name, institution_ids) VALUES (?, ?)",
+                (name, json.dumps(list(dict.fromkeys(ids)))),
+            )
+
+    def resolve(self, selector):
+        """
+        Institution IDs for a group name, an institution ID, or several IDs
+        joined with '|'. Raises KeyError if it is none of these.
+        """
+        groups = self.groups()
+        if selector in groups:
+            return list(groups[selector])
+        ids = [short_institution_id(part) for part in str(selector).split("|") if part.strip()]
+        if ids and all(re.fullmatch(r"I\d+", institution_id) for institution_id in ids):
+            return ids
+        raise KeyError(selector)
+
+    def label(self, institution_ids):
+        """Short human label for a set of institutions: its group name if it has one."""
+        key = institutions_key(institution_ids)
+        for name, group_ids in self.groups().items():
+            if institutions_key(group_ids) == key:
+                return name
+        return " + ".join(self.display_name(institution_id) for institution_id in institution_ids)
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_institution_registry():
+    """Returns the process-wide InstitutionRegistry instance."""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = InstitutionRegistry()
+        return _default_registry
+
+
+def fetch_institution_pages(out_dir, filter_str=None, per_page=200):
+    """
+    Saves every /institutions API page (optionally filtered, e.g.
+    "country_code:US") as JSON files in out_dir. Returns the file paths.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    cursor = "*"
+    while cursor:
+        params = {"per_page": per_page, "cursor": cursor}
+        if filter_str:
+            params["filter"] = filter_str
+        data = get_json(INSTITUTIONS_URL, params=params, select=INSTITUTION_FIELDS)
+        if not data.get("results"):
+            break
+        path = os.path.join(out_dir, f"institutions_{len(paths):05d}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"results": data["results"]}, f)
+        paths.append(path)
+        cursor = (data.get("meta") or {}).get("next_cursor")
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the local OpenAlex institution registry.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    load_parser = subcommands.add_parser("load", help="load snapshot parts or saved API pages")
+    load_parser.add_argument("paths", nargs="+", help="files or glob patterns")
+    fetch_parser = subcommands.add_parser("fetch", help="cache /institutions API pages and load them")
+    fetch_parser.add_argument("--country", help="only institutions in this country code")
+    fetch_parser.add_argument("--out-dir", default=os.path.join(CACHE_DIR, "institution_pages"))
+    search_parser = subcommands.add_parser("search", help="type-ahead search of the registry")
+    search_parser.add_argument("query")
+    args = parser.parse_args(argv)
+
+    registry = get_institution_registry()
+    if args.command == "load":
+        paths = [path for pattern in args.paths for path in sorted(glob.glob(pattern)) or [pattern]]
+        print(f"Loaded {registry.load_files(paths)} institution(s) from {len(paths)} file(s).")
+    elif args.command == "fetch":
+        paths = fetch_institution_pages(args.out_dir, f"country_code:{args.country}" if args.country else None)
+        print(f"Loaded {registry.load_files(paths)} institution(s) from {len(paths)} page(s).")
+    else:
+        for entry in registry.search(args.query):
+            print(f"{entry['id']:<12} {entry['works_count']:>9}  {entry['display_name']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,528 @@
+"""
+Local stand-in for the OpenAlex API, for offline benchmarks and debugging.
+
+Serves `/authors`, `/works` (and single `/works/{id}`) and `/institutions`
+from a fixture: a JSON file of OpenAlex-shaped records ({"authors": [...],
+"works": [...], "institutions": [...]}), either recorded from the live API with the `record`
+command or generated with `make_dataset`. Supports the filters, `select=`,
+`sort=publication_date:desc` and cursor/page pagination that Chewie uses,
+with configurable latency, error rate and page size.
+
+    python mock_openalex.py serve --authors 100 --latency 0.05 --port 8765
+    OPENALEX_API_BASE=http://127.0.0.1:8765 streamlit run app.py
+
+    python mock_openalex.py record --university MIT --roster names.txt --out mit.json
+"""
+import argparse
+import base64
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from vip_matcher import name_tokens, short_author_id as short_id
+
+OPENALEX_PREFIX = "https://openalex.org/"
+MAX_LISTED_AUTHORSHIPS = 100
+
+_FIRST_NAMES = [
+    "James", "Mary", "Wei", "Priya", "Carlos", "Fatima", "John", "Elena", "Hiroshi", "Amara",
+    "David", "Sofia", "Ahmed", "Olga", "Daniel", "Mei", "Robert", "Ana", "Kwame", "Ingrid",
+    "Michael", "Yuki", "Peter", "Lucia", "Omar", "Hannah", "Jennifer", "Ravi", "Thomas", "Gül",
+    "William", "Chen", "Andrea", "Sergei", "Laura", "Jun", "Rebecca", "Mateo", "Aisha", "Kevin",
+]
+_LAST_NAMES = [
+    "Smith", "Wang", "Garcia", "Kim", "Nguyen", "Müller", "Patel", "Johnson", "Li", "Rossi",
+    "Brown", "Zhang", "Martin", "Kowalski", "Silva", "Tanaka", "Chen", "Dölen", "Okafor", "Lee",
+    "Anderson", "Nuñez", "Schmidt", "Liu", "Taylor", "Ivanova", "Cohen", "Yamamoto", "Singh", "Moore",
+    "Doudna", "Park", "Lopez", "Hansen", "Wilson", "Sato", "Ali", "Murphy", "Novak", "Khan",
+    "Clark", "Huang", "Fischer", "Santos", "Walker", "Yang", "Costa", "Wright", "Zhao", "Dubois",
+    "Hall", "Wu", "Ortiz", "Berg", "Young", "Xu", "Ramos", "King", "Sun", "Meyer",
+]
+_JOURNALS = [
+    "Nature", "Science", "Cell", "PNAS", "Neuron", "eLife", "Nature Methods", "Physical Review Letters",
+    "Journal of the American Chemical Society", "bioRxiv", "arXiv", "PLOS ONE", "Nature Communications",
+]
+_TITLE_WORDS = [
+    "neural", "dynamics", "protein", "single-cell", "imaging", "genome", "editing", "synthesis",
+    "catalysis", "framework", "cortex", "learning", "metabolic", "structure", "mapping", "quantum",
+    "sensing", "therapy", "models", "signalling", "evolution", "materials", "microscopy", "variants",
+]
+
+
+def make_dataset(num_authors, works_per_author=6, institution_ids=("I95457486",), days=365,
+                 missing_fraction=0.05, seed=0):
+    """
+    Generates a synthetic fixture with `num_authors` roster authors at the given
+    institutions (plus same-surname authors elsewhere, so name filtering has
+    work to do). Returns (dataset, roster names); roughly missing_fraction of
+    the roster are names that don't exist.
+    """
+    rng = random.Random(seed)
+    institutions = [
+        {"id": OPENALEX_PREFIX + inst_id, "display_name": f"Institution {inst_id}", "works_count": 0}
+        for inst_id in list(institution_ids) + ["I999999999"]
+    ]
+    home = [inst["id"] for inst in institutions[:-1]]
+    elsewhere = institutions[-1]["id"]
+
+    pairs = [(first, last) for first in _FIRST_NAMES for last in _LAST_NAMES]
+    rng.shuffle(pairs)
+    authors = []
+    roster = []
+    for n in range(num_authors):
+        first, last = pairs[n % len(pairs)]
+        # Past the unique combinations, add a middle initial to keep names distinct
+        if n >= len(pairs):
+            first = f"{first} {chr(ord('A') + (n // len(pairs)) % 26)}."
+        name = f"{first} {last}"
+        authors.append({
+            "id": f"{OPENALEX_PREFIX}A{5000000000 + n}",
+            "display_name": name,
+            "last_known_institutions": [{"id": rng.choice(home)}],
+        })
+        roster.append(name)
+    # Namesakes at another institution
+    for n in range(num_authors // 2):
+        first, last = pairs[(n * 7 + 3) % len(pairs)]
+        authors.append({
+            "id": f"{OPENALEX_PREFIX}A{6000000000 + n}",
+            "display_name": f"{first} {last}",
+            "last_known_institutions": [{"id": elsewhere}],
+        })
+    for n in range(int(num_authors * missing_fraction)):
+        roster.append(f"Nobody Unknown{n}")
+
+    home_authors = authors[:num_authors]
+    today = date.today()
+    works = []
+    for n in range(num_authors * works_per_author):
+        lead = home_authors[n % num_authors]
+        # Most papers have a handful of authors; a few are large consortium papers
+        team_size = rng.choice([1, 2, 3, 4, 5, 6, 8]) if rng.random() > 0.01 else rng.randint(200, 1500)
+        team = [lead] + rng.sample(authors, min(team_size - 1, len(authors)))
+        pub_date = today - timedelta(days=rng.randint(0, days))
+        work_id = f"W{7000000000 + n}"
+        title = " ".join(rng.sample(_TITLE_WORDS, rng.randint(3, 7))).capitalize()
+        works.append({
+            "id": OPENALEX_PREFIX + work_id,
+            "display_name": title,
+            "publication_date": pub_date.isoformat(),
+            "doi": f"https://doi.org/10.5555/{work_id.lower()}",
+            "primary_location": {
+                "landing_page_url": f"https://example.org/{work_id}",
+                "source": {"display_name": rng.choice(_JOURNALS)},
+            },
+            "authorships": [
+                {
+                    "author": {"id": author["id"], "display_name": author["display_name"]},
+                    "institutions": [{"id": inst["id"]} for inst in author["last_known_institutions"]],
+                }
+                for author in team
+            ],
+            "cited_by_count": rng.randint(0, 500),
+            "abstract_inverted_index": {word: [i] for i, word in enumerate(title.split())},
+        })
+
+    for inst in institutions:
+        inst["works_count"] = sum(
+            1 for work in works
+            if any(i["id"] == inst["id"] for a in work["authorships"] for i in a["institutions"])
+        )
+    return {"authors": authors, "works": works, "institutions": institutions}, roster
+
+
+def _encode_cursor(offset):
+    return base64.urlsafe_b64encode(str(offset).encode()).decode()
+
+
+def _decode_cursor(cursor):
+    if cursor in (None, "", "*"):
+        return 0
+    return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+
+
+def _date_matches(value, condition):
+    if not value:
+        return False
+    if condition.startswith(">"):
+        return value > condition[1:]
+    if condition.startswith("<"):
+        return value < condition[1:]
+    return value == condition
+
+
+class _Index:
+    """Pre-built lookups over a fixture so large datasets serve quickly."""
+
+    def __init__(self, dataset):
+        self.authors = dataset.get("authors", [])
+        self.works = sorted(
+            dataset.get("works", []), key=lambda w: w.get("publication_date") or "", reverse=True
+        )
+        self.institutions = dataset.get("institutions", [])
+        self.works_by_id = {short_id(work["id"]): work for work in self.works}
+        self.works_by_author = {}
+        self.works_by_institution = {}
+        for position, work in enumerate(self.works):
+            for authorship in work.get("authorships") or []:
+                author_id = short_id((authorship.get("author") or {}).get("id"))
+                self.works_by_author.setdefault(author_id, set()).add(position)
+                for inst in authorship.get("institutions") or []:
+                    self.works_by_institution.setdefault(short_id(inst.get("id")), set()).add(position)
+        # Like the API, name searches also look at display_name_alternatives
+        self.author_tokens = [
+            set().union(*(name_tokens(name or "") for name in [a.get("display_name")] + (a.get("display_name_alternatives") or [])))
+            for a in self.authors
+        ]
+
+
+class MockOpenAlex:
+    """
+    Threaded HTTP server replaying a fixture. Use as a context manager;
+    `base_url` is the value for OPENALEX_API_BASE.
+    """
+
+    def __init__(self, dataset, latency=0.0, error_rate=0.0, max_per_page=200, port=0, seed=0):
+        self.index = _Index(dataset)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_per_page = max_per_page
+        self.port = port
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.request_counts = {}
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; without this, Nagle plus
+            # delayed ACKs add ~40 ms to every keep-alive response
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                status, body, headers = mock.handle(self.path)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def load(self, dataset):
+        """Swaps in a different fixture without restarting the server."""
+        self.index = _Index(dataset)
+
+    def reset_counts(self):
+        with self._lock:
+            self.request_counts = {}
+
+    def handle(self, path):
+        """Returns (status, JSON body, extra headers) for a request path."""
+        url = urlparse(path)
+        endpoint, _, entity_id = url.path.strip("/").partition("/")
+        counted = f"{endpoint}/{{id}}" if entity_id else endpoint
+        with self._lock:
+            self.request_counts[counted] = self.request_counts.get(counted, 0) + 1
+            roll = self._rng.random()
+        if self.latency:
+            time.sleep(self.latency)
+        if roll < self.error_rate:
+            if roll < self.error_rate / 2:
+                return 429, {"error": "Too many requests"}, {"Retry-After": "0"}
+            return 500, {"error": "Internal server error"}, {}
+
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if entity_id:
+            # Single works carry every authorship, like the real API
+            work = self.index.works_by_id.get(short_id(entity_id)) if endpoint == "works" else None
+            if work is None:
+                return 404, {"error": f"{endpoint}/{entity_id} not found"}, {}
+            select = params.get("select")
+            if select:
+                work = {field: work[field] for field in select.split(",") if field in work}
+            return 200, work, {}
+        try:
+            filters = self._parse_filter(params.get("filter", ""))
+            if endpoint == "authors":
+                records = self._authors(filters)
+            elif endpoint == "works":
+                records = self._works(filters)
+            elif endpoint == "institutions":
+                records = self._institutions(filters)
+            else:
+                return 404, {"error": f"Unknown endpoint {endpoint}"}, {}
+        except ValueError as e:
+            return 400, {"error": str(e)}, {}
+
+        per_page = min(int(params.get("per_page", 25)), self.max_per_page)
+        if "cursor" in params:
+            offset = _decode_cursor(params["cursor"])
+        else:
+            offset = (int(params.get("page", 1)) - 1) * per_page
+        page = records[offset:offset + per_page]
+        next_cursor = None
+        if "cursor" in params and offset + per_page < len(records):
+            next_cursor = _encode_cursor(offset + per_page)
+
+        if endpoint == "works":
+            # Like the real API, list responses carry at most 100 authorships per work
+            page = [
+                dict(work, authorships=work["authorships"][:MAX_LISTED_AUTHORSHIPS], is_authors_truncated=True)
+                if len(work.get("authorships") or []) > MAX_LISTED_AUTHORSHIPS else work
+                for work in page
+            ]
+
+        select = params.get("select")
+        if select:
+            fields = select.split(",")
+            page = [{field: record.get(field) for field in fields if field in record} for record in page]
+
+        meta = {"count": len(records), "per_page": per_page, "next_cursor": next_cursor}
+        return 200, {"meta": meta, "results": page}, {}
+
+    @staticmethod
+    def _parse_filter(filter_str):
+        filters = {}
+        for clause in filter_str.split(","):
+            if not clause:
+                continue
+            key, sep, value = clause.partition(":")
+            if not sep:
+                raise ValueError(f"Invalid filter clause {clause!r}")
+            filters[key] = value
+        return filters
+
+    def _authors(self, filters):
+        supported = {"display_name.search", "last_known_institutions.id", "id"}
+        unknown = set(filters) - supported
+        if unknown:
+            raise ValueError(f"Unsupported authors filter(s): {', '.join(sorted(unknown))}")
+        search = set(name_tokens(filters.get("display_name.search", "")))
+        institutions = {short_id(i) for i in filters["last_known_institutions.id"].split("|")} \
+            if "last_known_institutions.id" in filters else None
+        ids = {short_id(i) for i in filters["id"].split("|")} if "id" in filters else None
+
+        results = []
+        for author, tokens in zip(self.index.authors, self.index.author_tokens):
+            if search and not search <= tokens:
+                continue
+            if ids is not None and short_id(author["id"]) not in ids:
+                continue
+            if institutions is not None and not any(
+                short_id(inst.get("id")) in institutions for inst in author.get("last_known_institutions") or []
+            ):
+                continue
+            results.append(author)
+        return results
+
+    def _works(self, filters):
+        supported = {
+            "authorships.author.id", "authorships.institutions.id", "publication_date",
+            "from_publication_date", "to_publication_date", "ids.openalex",
+        }
+        unknown = set(filters) - supported
+        if unknown:
+            raise ValueError(f"Unsupported works filter(s): {', '.join(sorted(unknown))}")
+
+        candidates = None
+        for key, lookup in (
+            ("authorships.author.id", self.index.works_by_author),
+            ("authorships.institutions.id", self.index.works_by_institution),
+        ):
+            if key in filters:
+                matched = set()
+                for value in filters[key].split("|"):
+                    matched |= lookup.get(short_id(value), set())
+                candidates = matched if candidates is None else candidates & matched
+        if "ids.openalex" in filters:
+            wanted = {short_id(i) for i in filters["ids.openalex"].split("|")}
+            matched = {p for p, w in enumerate(self.index.works) if short_id(w["id"]) in wanted}
+            candidates = matched if candidates is None else candidates & matched
+        positions = sorted(candidates) if candidates is not None else range(len(self.index.works))
+
+        results = []
+        for position in positions:
+            work = self.index.works[position]
+            pub_date = work.get("publication_date")
+            if "publication_date" in filters and not _date_matches(pub_date, filters["publication_date"]):
+                continue
+            if "from_publication_date" in filters and not (pub_date and pub_date >= filters["from_publication_date"]):
+                continue
+            if "to_publication_date" in filters and not (pub_date and pub_date <= filters["to_publication_date"]):
+                continue
+            results.append(work)
+        return results
+
+    def _institutions(self, filters):
+        supported = {"display_name.search", "id"}
+        unknown = set(filters) - supported
+        if unknown:
+            raise ValueError(f"Unsupported institutions filter(s): {', '.join(sorted(unknown))}")
+        search = set(name_tokens(filters.get("display_name.search", "")))
+        ids = {short_id(i) for i in filters["id"].split("|")} if "id" in filters else None
+        return [
+            inst for inst in self.index.institutions
+            if (not search or search <= set(name_tokens(inst.get("display_name") or "")))
+            and (ids is None or short_id(inst["id"]) in ids)
+        ]
+
+
+def record_fixture(university_ids, names, days_back=365):
+    """
+    Records the live API responses a search over `names` would use into a
+    fixture dict (authors matching each surname, and their works in the window).
+    """
+    from name_matcher import surname_key
+    from openalex_client import WORKS_URL, get_json
+    from search_engine import search_authors
+
+    institutions_str = "|".join(university_ids)
+    authors = {}
+    for surname in dict.fromkeys(surname_key(name) for name in names):
+        if not surname:
+            continue
+        for author in search_authors(surname, institutions_str):
+            authors[author['id']] = author
+
+    start_date = (date.today() - timedelta(days=days_back)).isoformat()
+    works = {}
+    author_ids = list(authors)
+    for i in range(0, len(author_ids), 25):
+        cursor = "*"
+        while cursor:
+            data = get_json(WORKS_URL, params={
+                'filter': (
+                    f"authorships.author.id:{'|'.join(author_ids[i:i + 25])},"
+                    f"authorships.institutions.id:{institutions_str},"
+                    f"publication_date:>{start_date}"
+                ),
+                'per_page': 200,
+                'cursor': cursor,
+            })
+            for work in data.get('results', []):
+                works[work['id']] = work
+            cursor = data.get('meta', {}).get('next_cursor') if data.get('results') else None
+
+    institutions = [
+        {"id": OPENALEX_PREFIX + inst_id, "display_name": inst_id, "works_count": 0}
+        for inst_id in university_ids
+    ]
+    return {"authors": list(authors.values()), "works": list(works.values()), "institutions": institutions}
+
+
+def write_snapshot(dataset, out_dir, num_partitions=2):
+    """
+    Writes a fixture as OpenAlex snapshot partitions for snapshot_index.py:
+    <out_dir>/{works,authors}/updated_date=2024-01-0N/part_000.gz, records
+    spread round-robin over num_partitions. Returns the partition paths.
+    """
+    paths = []
+    for kind in ("works", "authors"):
+        records = dataset.get(kind, [])
+        for n in range(num_partitions):
+            folder = os.path.join(out_dir, kind, f"updated_date=2024-01-{n + 1:02d}")
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, "part_000.gz")
+            with gzip.open(path, "wt", encoding="utf-8") as f:
+                for record in records[n::num_partitions]:
+                    f.write(json.dumps(record) + "\n")
+            paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local mock of the OpenAlex API.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="serve a fixture (or a generated dataset)")
+    serve.add_argument("--fixture", help="fixture JSON file; omit to generate a synthetic dataset")
+    serve.add_argument("--authors", type=int, default=100, help="roster size for a generated dataset")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    serve.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 429/500")
+    serve.add_argument("--max-per-page", type=int, default=200, help="cap on per_page, to force pagination")
+
+    record = commands.add_parser("record", help="record a fixture from the live API")
+    record.add_argument("--university", required=True, help="institution group or OpenAlex ID(s), as in the batch CLI")
+    record.add_argument("--roster", required=True, help="text file with one author name per line")
+    record.add_argument("--days", type=int, default=365)
+    record.add_argument("--out", required=True, help="fixture JSON file to write")
+
+    snapshot = commands.add_parser("snapshot", help="write a fixture as snapshot partitions")
+    snapshot.add_argument("--fixture", help="fixture JSON file; omit to generate a synthetic dataset")
+    snapshot.add_argument("--authors", type=int, default=100, help="roster size for a generated dataset")
+    snapshot.add_argument("--partitions", type=int, default=2)
+    snapshot.add_argument("--out", required=True, help="folder to write works/ and authors/ into")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        from institution_registry import get_institution_registry
+        with open(args.roster, encoding="utf-8") as f:
+            names = [line.strip() for line in f if line.strip()]
+        fixture = record_fixture(get_institution_registry().resolve(args.university), names, args.days)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(fixture, f)
+        print(f"Recorded {len(fixture['authors'])} authors and {len(fixture['works'])} works to {args.out}")
+        return
+
+    if args.fixture:
+        with open(args.fixture, encoding="utf-8") as f:
+            dataset = json.load(f)
+    else:
+        dataset, roster = make_dataset(args.authors)
+        print("Sample roster:", ", ".join(roster[:5]), "...")
+
+    if args.command == "snapshot":
+        paths = write_snapshot(dataset, args.out, args.partitions)
+        print(f"Wrote {len(paths)} partition(s) to {args.out}")
+        return
+
+    server = MockOpenAlex(dataset, latency=args.latency, error_rate=args.error_rate,
+                          max_per_page=args.max_per_page, port=args.port).start()
+    print(f"Mock OpenAlex serving {len(dataset.get('works', []))} works at {server.base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
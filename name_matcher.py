@@ -0,0 +1,148 @@
+"""
+Roster name matching for author resolution.
+
+Names are folded once into accent-free lowercase tokens (split on spaces,
+hyphens and punctuation, see vip_matcher.name_tokens). A roster name matches
+a candidate name when its surname (last token) is one of the candidate's
+tokens and every other token is matched by a different candidate token:
+the same token, or an initial of it ("J. Doudna" / "Jennifer A. Doudna").
+Hyphenated given names also match their run-together form, on either side
+("Jun-Chau Chien" finds "Junchau Chien" and the other way round). Extra
+candidate tokens such as middle names are allowed and word order is
+ignored, so "Gül Dölen" finds "Gul Dolen" and "Dolen Gul". Roster middle
+initials are only dropped when nothing matches with them.
+
+Candidates are indexed by token over their display_name and
+display_name_alternatives, so matching a whole roster costs one dict lookup
+per name plus a check of the few authors sharing its surname.
+"""
+from vip_matcher import name_tokens
+
+# Scores per matched token: the same token, or an initial against a full token
+_EXACT = 2
+_INITIAL = 1
+
+
+def surname_key(name):
+    """The folded surname (last token) a name is searched and indexed by; "" if blank."""
+    tokens = name_tokens(name)
+    return tokens[-1] if tokens else ""
+
+
+def _token_score(query_token, candidate_token):
+    if query_token == candidate_token:
+        return _EXACT
+    if len(query_token) == 1 and candidate_token.startswith(query_token):
+        return _INITIAL
+    if len(candidate_token) == 1 and query_token.startswith(candidate_token):
+        return _INITIAL
+    return 0
+
+
+def _assign(given, available):
+    # Matches each given-name token to a different candidate token, full
+    # tokens first; returns the summed score, or None if one is unmatched
+    available = list(available)
+    score = 0
+    for token in sorted(given, key=len, reverse=True):
+        best, best_index = 0, None
+        for index, candidate_token in enumerate(available):
+            token_score = _token_score(token, candidate_token)
+            if token_score > best:
+                best, best_index = token_score, index
+        if best_index is None:
+            return None
+        score += best
+        del available[best_index]
+    return score
+
+
+def match_score(query_tokens, candidate_tokens):
+    """
+    Scores how well a folded roster name matches one folded candidate name;
+    0 means no match. Higher scores mean more tokens matched in full.
+    """
+    if not query_tokens or query_tokens[-1] not in candidate_tokens:
+        return 0
+    available = list(candidate_tokens)
+    available.remove(query_tokens[-1])
+    given = query_tokens[:-1]
+    score = _assign(given, available)
+    # Hyphenated given names split into tokens; also try them run together,
+    # on the roster side and as any run of adjacent candidate tokens
+    attempts = []
+    if len(given) > 1 and all(len(token) > 1 for token in given):
+        attempts.append((("".join(given),), available))
+    if any(len(token) > 1 for token in given):
+        for start in range(len(available) - 1):
+            for end in range(start + 2, len(available) + 1):
+                run = available[start:end]
+                if all(len(token) > 1 for token in run):
+                    attempts.append((given, available[:start] + ["".join(run)] + available[end:]))
+    for attempt_given, attempt_available in attempts:
+        merged = _assign(attempt_given, attempt_available)
+        if merged is not None and (score is None or merged > score):
+            score = merged
+    return 0 if score is None else _EXACT + score
+
+
+class NameIndex:
+    """Token index over candidate authors for matching many roster names."""
+
+    def __init__(self, authors=()):
+        """`authors` is an iterable of OpenAlex author dicts (id, display_name, display_name_alternatives)."""
+        self._names = {}  # author ID -> list of folded name variants
+        self._by_token = {}  # token -> author IDs with a variant containing it
+        for author in authors:
+            self.add_author(author)
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, author_id, names):
+        """Indexes an author ID under each of its name variants."""
+        if not author_id:
+            return
+        variants = self._names.setdefault(author_id, [])
+        for name in names:
+            tokens = name_tokens(name or "")
+            if not tokens or tokens in variants:
+                continue
+            variants.append(tokens)
+            for token in set(tokens):
+                ids = self._by_token.setdefault(token, [])
+                if not ids or ids[-1] != author_id:
+                    ids.append(author_id)
+
+    def add_author(self, author):
+        self.add(author.get('id'), [author.get('display_name')] + list(author.get('display_name_alternatives') or []))
+
+    def match(self, name):
+        """
+        Returns the IDs of authors matching `name`, best match first (index
+        order on ties). If nothing matches, middle initials the candidates
+        may omit are dropped and the match retried ("Jennifer A. Doudna" then
+        finds "Jennifer Doudna").
+        """
+        query = name_tokens(name)
+        matches = self._match_tokens(query)
+        if not matches and len(query) > 2:
+            relaxed = (query[0],) + tuple(token for token in query[1:-1] if len(token) > 1) + (query[-1],)
+            if relaxed != query:
+                matches = self._match_tokens(relaxed)
+        return matches
+
+    def _match_tokens(self, query):
+        if not query:
+            return []
+        scored = []
+        for position, author_id in enumerate(dict.fromkeys(self._by_token.get(query[-1], ()))):
+            score = max(match_score(query, variant) for variant in self._names[author_id])
+            if score:
+                scored.append((-score, position, author_id))
+        scored.sort()
+        return [author_id for _, _, author_id in scored]
+
+    def match_many(self, names):
+        """Returns {name: [author IDs]} for each of `names`."""
+        return {name: self.match(name) for name in names}
@@ -0,0 +1,413 @@
+"""
+Shared HTTP plumbing for talking to the OpenAlex API.
+
+Every request goes through one keep-alive session so repeated lookups reuse
+pooled TCP/TLS connections instead of opening a new one per call. A shared
+adaptive limiter keeps concurrent callers under the OpenAlex rate limit, and
+transient failures are retried with backoff instead of being dropped.
+Responses are trimmed with `select=` projections and decoded with orjson
+when it is installed.
+"""
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; fall back to the stdlib decoder
+    orjson = None
+
+# OpenAlex API endpoints; OPENALEX_API_BASE points them elsewhere (e.g. mock_openalex.py)
+OPENALEX_BASE = os.environ.get("OPENALEX_API_BASE", "https://api.openalex.org").rstrip("/")
+AUTHORS_URL = f"{OPENALEX_BASE}/authors"
+WORKS_URL = f"{OPENALEX_BASE}/works"
+INSTITUTIONS_URL = f"{OPENALEX_BASE}/institutions"
+
+# Max number of requests in flight at once (also the connection pool size)
+MAX_WORKERS = 8
+# OpenAlex allows roughly 10 requests per second per client
+MAX_REQUESTS_PER_SECOND = 10
+REQUEST_TIMEOUT = 10
+
+# Fields actually read from each endpoint, sent as `select=` projections
+AUTHOR_FIELDS = ("id", "display_name", "display_name_alternatives")
+WORK_FIELDS = (
+    "id", "display_name", "publication_date", "authorships", "primary_location", "doi", "is_authors_truncated"
+)
+
+
+def decode_json(content):
+    """Decodes a JSON response body, preferring orjson when available."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+class RequestStats:
+    """Thread-safe tally of requests, retries, bytes downloaded, JSON decode time and phase timings."""
+
+    # Subclasses that keep per-request records set this (see SearchTrace)
+    tracing = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.bytes_received = 0
+        self.decode_seconds = 0.0
+        self.retries = 0
+        self.phases = {}
+        # Query plan the search used ("author" or "institution"), set by search_engine
+        self.plan = None
+
+    def record_request(self, url, params, status, seconds, num_bytes, retries):
+        """Per-request hook; only called when `tracing` is set."""
+
+    def record_phase(self, name, seconds):
+        """Adds wall time spent in a named pipeline phase."""
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record(self, num_bytes, decode_seconds):
+        with self._lock:
+            self.requests += 1
+            self.bytes_received += num_bytes
+            self.decode_seconds += decode_seconds
+
+    def summary(self):
+        """One-line human readable summary."""
+        plan = f"{self.plan}-first plan, " if self.plan else ""
+        return (
+            f"{plan}{self.requests} request(s), {self.retries} retried, {self.bytes_received / 1e6:.2f} MB downloaded, "
+            f"{self.decode_seconds * 1000:.0f} ms JSON decoding"
+            f" ({'orjson' if orjson is not None else 'json'})"
+        )
+
+
+class SearchTrace(RequestStats):
+    """
+    RequestStats that also keeps one record per OpenAlex request (endpoint,
+    query, status, latency, bytes, retries) for the Performance panel and
+    JSON export. Plain RequestStats skip this bookkeeping entirely.
+    """
+
+    tracing = True
+
+    def __init__(self, label=None):
+        super().__init__()
+        self.label = label
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.request_log = []
+
+    def record_request(self, url, params, status, seconds, num_bytes, retries):
+        entry = {
+            "offset_ms": round((time.perf_counter() - self._started - seconds) * 1000, 1),
+            "endpoint": url.rsplit("/", 1)[-1],
+            "params": {key: value for key, value in params.items() if key != "mailto"},
+            "status": status,
+            "latency_ms": round(seconds * 1000, 1),
+            "bytes": num_bytes,
+            "retries": retries,
+        }
+        with self._lock:
+            self.request_log.append(entry)
+
+    def request_summary(self):
+        """Per-endpoint counts, failures and latency percentiles (ms)."""
+        with self._lock:
+            log = list(self.request_log)
+        summary = {}
+        for endpoint in sorted({entry["endpoint"] for entry in log}):
+            entries = [entry for entry in log if entry["endpoint"] == endpoint]
+            latencies = sorted(entry["latency_ms"] for entry in entries)
+            summary[endpoint] = {
+                "requests": len(entries),
+                "failed": sum(1 for entry in entries if entry["status"] != 200),
+                "retries": sum(entry["retries"] for entry in entries),
+                "megabytes": round(sum(entry["bytes"] for entry in entries) / 1e6, 2),
+                "p50_ms": latencies[len(latencies) // 2],
+                "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                "max_ms": latencies[-1],
+            }
+        return summary
+
+    def to_dict(self):
+        """Everything recorded, in a JSON-serializable form."""
+        with self._lock:
+            log = list(self.request_log)
+            phases = dict(self.phases)
+        return {
+            "label": self.label,
+            "plan": self.plan,
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+            "totals": {
+                "requests": self.requests,
+                "retries": self.retries,
+                "bytes_received": self.bytes_received,
+                "decode_seconds": round(self.decode_seconds, 4),
+                "json_decoder": "orjson" if orjson is not None else "json",
+            },
+            "phases": {name: round(seconds, 4) for name, seconds in phases.items()},
+            "endpoints": self.request_summary(),
+            "requests": log,
+        }
+
+
+class AdaptiveLimiter:
+    """
+    Token bucket plus an adaptive cap on requests in flight.
+
+    Tokens refill at `rate` per second (with a burst of up to `burst`), and at
+    most `concurrency` requests may be in flight. A 429 halves both the
+    in-flight cap and the rate (at most once per cooldown, since a burst of
+    429s usually comes from requests that were already in flight); every run
+    of successes afterwards nudges them back up towards their configured
+    maximums (additive increase, multiplicative decrease).
+    """
+
+    # Successful responses needed before raising the caps one step again
+    RECOVERY_STEP = 20
+    # Fraction of the maximum rate restored per recovery step
+    RECOVERY_FRACTION = 0.1
+    # Minimum seconds between two cuts
+    CUT_COOLDOWN = 1.0
+
+    def __init__(self, rate, concurrency=MAX_WORKERS, burst=None):
+        self.max_rate = float(rate)
+        self.max_concurrency = concurrency
+        self.rate = self.max_rate
+        self.concurrency = concurrency
+        self.burst = burst or max(1.0, self.max_rate)
+        self._tokens = self.burst
+        self._last_refill = time.monotonic()
+        self._in_flight = 0
+        self._successes = 0
+        self._last_cut = float("-inf")
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self):
+        """Blocks until a request may start."""
+        with self._cond:
+            while True:
+                if self._in_flight < self.concurrency:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self._in_flight += 1
+                        return
+                    timeout = (1 - self._tokens) / self.rate
+                else:
+                    timeout = None
+                self._cond.wait(timeout)
+
+    def release(self, throttled=False):
+        """Marks a request finished; throttled=True if OpenAlex answered 429."""
+        with self._cond:
+            self._in_flight -= 1
+            if throttled:
+                self._successes = 0
+                now = time.monotonic()
+                if now - self._last_cut >= self.CUT_COOLDOWN:
+                    self._last_cut = now
+                    self.concurrency = max(1, self.concurrency // 2)
+                    self.rate = max(0.5, self.rate / 2)
+                    self._tokens = min(self._tokens, 0)
+            else:
+                self._successes += 1
+                if self._successes >= self.RECOVERY_STEP:
+                    self._successes = 0
+                    self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+                    self.rate = min(self.max_rate, self.rate + max(1.0, self.max_rate * self.RECOVERY_FRACTION))
+            self._cond.notify_all()
+
+
+# Retry policy for transient failures (throttling, server errors, network blips)
+MAX_RETRIES = int(os.environ.get("CHEWIE_MAX_RETRIES", 5))
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Identifies us to OpenAlex's "polite pool"; set OPENALEX_MAILTO to a contact address
+OPENALEX_MAILTO = os.environ.get("OPENALEX_MAILTO")
+
+# A local snapshot index (see snapshot_index.py) to answer requests from instead of the API
+SNAPSHOT_DIR = os.environ.get("CHEWIE_SNAPSHOT_DIR")
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter for retry number `attempt` (0-based)."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def retry_after_seconds(response):
+    """Parses a Retry-After header (seconds or HTTP date); None if absent or invalid."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return min(BACKOFF_MAX, max(0.0, float(value)))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return min(BACKOFF_MAX, max(0.0, retry_at.timestamp() - time.time()))
+
+
+_session = None
+_session_lock = threading.Lock()
+_limiter = AdaptiveLimiter(MAX_REQUESTS_PER_SECOND)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def set_backend(backend):
+    """
+    Answers get_json from `backend` instead of the API: any object with a
+    get(url, params) -> (response dict, bytes read) method, such as
+    snapshot_index.SnapshotIndex. None goes back to the API.
+    """
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def get_backend():
+    """Returns the local backend in use, if any (opening CHEWIE_SNAPSHOT_DIR on first use)."""
+    global _backend
+    with _backend_lock:
+        if _backend is None and SNAPSHOT_DIR:
+            # Imported here because snapshot_index uses this module's decoder
+            from snapshot_index import SnapshotIndex
+            _backend = SnapshotIndex(SNAPSHOT_DIR)
+        return _backend
+
+
+def _get_local(backend, url, params, stats):
+    # get_json for a local backend: no rate limit, retries or HTTP
+    started = time.perf_counter()
+    status = 200
+    num_bytes = 0
+    try:
+        data, num_bytes = backend.get(url, params)
+        if stats is not None:
+            stats.record(num_bytes, time.perf_counter() - started)
+        return data
+    except ValueError as e:
+        status = 400
+        raise requests.exceptions.RequestException(f"Local index can't answer {url}: {e}") from e
+    finally:
+        if stats is not None and stats.tracing:
+            stats.record_request(url, params, status, time.perf_counter() - started, num_bytes, 0)
+
+
+def set_rate_limit(requests_per_second):
+    """
+    Changes this process's request rate, e.g. to give each worker process
+    its share of the overall OpenAlex budget.
+    """
+    global _limiter
+    _limiter = AdaptiveLimiter(requests_per_second)
+
+
+def get_session():
+    """Returns the process-wide keep-alive session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            if OPENALEX_MAILTO:
+                session.headers["User-Agent"] = f"chewie (mailto:{OPENALEX_MAILTO})"
+            _session = session
+        return _session
+
+
+def get_json(url, params=None, select=None, stats=None, timeout=REQUEST_TIMEOUT):
+    """
+    Rate-limited GET against OpenAlex over the shared session.
+    `select` is an iterable of root-level fields to project the response to;
+    if `stats` (a RequestStats) is given, the body size and decode time are
+    added to it, and a SearchTrace also gets a per-request record.
+    Throttling (429), 5xx responses and connection errors are retried with
+    backoff, honoring Retry-After.
+    Raises requests.exceptions.RequestException once retries are exhausted
+    or on any other HTTP error.
+    With a local backend (see set_backend) the request never leaves the process.
+    """
+    params = dict(params or {})
+    if select:
+        params['select'] = ",".join(select)
+    backend = get_backend()
+    if backend is not None:
+        return _get_local(backend, url, params, stats)
+    if OPENALEX_MAILTO:
+        params['mailto'] = OPENALEX_MAILTO
+    
+    session = get_session()
+    started = time.perf_counter()
+    status = None
+    num_bytes = 0
+    attempt = 0
+    try:
+        for attempt in range(MAX_RETRIES + 1):
+            limiter = _limiter
+            limiter.acquire()
+            throttled = False
+            try:
+                response = session.get(url, params=params, timeout=timeout)
+                status = response.status_code
+                throttled = status == 429
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                status = type(e).__name__
+                if attempt == MAX_RETRIES:
+                    raise
+                delay = backoff_delay(attempt)
+            else:
+                if status not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                    break
+                delay = retry_after_seconds(response)
+                if delay is None:
+                    delay = backoff_delay(attempt)
+            finally:
+                limiter.release(throttled)
+            if stats is not None:
+                stats.record_retry()
+            time.sleep(delay)
+        
+        response.raise_for_status()
+        
+        content = response.content
+        num_bytes = len(content)
+        decode_started = time.perf_counter()
+        try:
+            data = decode_json(content)
+        except ValueError as e:
+            raise requests.exceptions.InvalidJSONError(str(e), response=response) from e
+        if stats is not None:
+            stats.record(num_bytes, time.perf_counter() - decode_started)
+        return data
+    finally:
+        if stats is not None and stats.tracing:
+            stats.record_request(url, params, status, time.perf_counter() - started, num_bytes, attempt)
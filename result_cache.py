@@ -0,0 +1,186 @@
+"""
+Process-wide cache of finished searches, shared by every Streamlit session.
+
+Identical searches running at the same time are coalesced: the first caller
+runs the search, later ones wait for its result instead of sending the same
+OpenAlex requests again. Finished results are kept in a bounded LRU whose
+size is measured in bytes (DataFrame deep memory usage), so server memory
+stays flat however many sessions look at the same roster.
+
+Cached DataFrames are shared between sessions and must not be modified.
+"""
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import CancelledError
+
+from sqlite_store import institutions_key
+
+# Memory budget (MB) for cached results and how long (seconds) they stay fresh
+RESULT_CACHE_MB = int(os.environ.get("CHEWIE_RESULT_CACHE_MB", 256))
+RESULT_CACHE_TTL = int(os.environ.get("CHEWIE_RESULT_CACHE_TTL", 3600))
+
+# How often (seconds) a caller waiting on another session's search checks whether it was cancelled
+CANCEL_POLL_SECONDS = 0.1
+
+
+def _tuple_contents_size(value):
+    # Bytes of the items in a tuple, nested tuples included
+    return sum(
+        sys.getsizeof(item) + (_tuple_contents_size(item) if isinstance(item, tuple) else 0)
+        for item in value
+    )
+
+
+def result_size(value):
+    """Approximate memory footprint in bytes of a (DataFrame, missing authors) result."""
+    df, missing_authors = value
+    size = int(df.memory_usage(index=True, deep=True).sum())
+    # Deep memory usage counts a tuple cell (such as the hidden _author_names
+    # and _affiliations columns) but not the strings inside it
+    for column in df.columns:
+        if df[column].dtype == object:
+            size += sum(_tuple_contents_size(cell) for cell in df[column] if isinstance(cell, tuple))
+    return size + sum(sys.getsizeof(name) for name in missing_authors)
+
+
+class ResultCache:
+    """Thread-safe LRU of search results with single-flight computation."""
+
+    def __init__(self, max_bytes=RESULT_CACHE_MB * 1024 * 1024, ttl=RESULT_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()  # key -> (value, size, stored_at)
+        self._in_flight = {}  # key -> {"done": Event set when the owner finishes, "value": its result}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key):
+        # Caller holds the lock
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, size, stored_at = entry
+        if time.time() - stored_at > self.ttl:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _remove(self, key):
+        # Caller holds the lock
+        _, size, _ = self._entries.pop(key)
+        self.total_bytes -= size
+
+    def get(self, key):
+        """Returns the cached result for key, or None."""
+        with self._lock:
+            return self._lookup(key)
+
+    def claim(self, key, cancelled=None):
+        """
+        Returns the cached result for key, waiting for an identical search in
+        progress if there is one. Returns None if the caller should run the
+        search itself: it then owns the key and must call put() with the
+        result or release() if it gives up, or other callers wait forever.
+        
+        `cancelled` (a threading.Event) lets a waiting caller give up: once
+        it is set, claim raises CancelledError without claiming the key.
+        """
+        while True:
+            with self._lock:
+                value = self._lookup(key)
+                if value is not None:
+                    self.hits += 1
+                    return value
+                flight = self._in_flight.get(key)
+                if flight is None:
+                    self._in_flight[key] = {"done": threading.Event(), "value": None}
+                    self.misses += 1
+                    return None
+            # Another session is running this search: share its result, or
+            # claim the key if it gave up
+            while not flight["done"].wait(CANCEL_POLL_SECONDS if cancelled is not None else None):
+                if cancelled.is_set():
+                    raise CancelledError
+            if flight["value"] is not None:
+                with self._lock:
+                    self.coalesced += 1
+                return flight["value"]
+
+    def put(self, key, value):
+        """Stores a result, evicting least recently used ones past the memory budget, and wakes waiters."""
+        size = result_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size <= self.max_bytes:
+                self._entries[key] = (value, size, time.time())
+                self.total_bytes += size
+                while self.total_bytes > self.max_bytes:
+                    self._remove(next(iter(self._entries)))
+            self._release(key, value)
+
+    def release(self, key):
+        """Gives up ownership of key without a result (no-op after put())."""
+        with self._lock:
+            self._release(key)
+
+    def _release(self, key, value=None):
+        # Caller holds the lock; waiters get `value` even if it was too big to cache
+        flight = self._in_flight.pop(key, None)
+        if flight is not None:
+            flight["value"] = value
+            flight["done"].set()
+
+    def invalidate(self, institution_ids=None):
+        """Drops cached results (all, or those for one institution set). Returns how many."""
+        with self._lock:
+            if institution_ids is None:
+                keys = list(self._entries)
+            else:
+                inst_key = institutions_key(institution_ids)
+                keys = [key for key in self._entries if key[0] == inst_key]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def summary(self):
+        """One-line description of occupancy and hit rates."""
+        with self._lock:
+            return (
+                f"{len(self._entries)} result(s), {self.total_bytes / 1e6:.1f}/{self.max_bytes / 1e6:.0f} MB, "
+                f"{self.hits} hit(s), {self.coalesced} coalesced, {self.misses} miss(es)"
+            )
+
+
+def search_key(university_ids, author_names, days_back, day=None, institution_groups=None):
+    """
+    Cache key of a search: institution set, roster (in order), window and
+    how institutions are grouped for comparison. Includes the date, since
+    the window is relative to today. The query plan is left out as every
+    plan gives the same table.
+    """
+    day = day or time.strftime('%Y-%m-%d')
+    groups = tuple(
+        (label, institutions_key(ids)) for label, ids in institution_groups.items()
+    ) if institution_groups else None
+    return (institutions_key(university_ids), tuple(author_names), days_back, day, groups)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Returns the process-wide ResultCache instance."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResultCache()
+        return _default_cache
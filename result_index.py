@@ -0,0 +1,167 @@
+"""
+In-result search and facets over a finished search's results table.
+
+A ResultIndex is built once per results table and shared by every session
+showing it (get_result_index caches them by result cache key). Title,
+journal and author-name tokens map to the rows containing them, and each
+row's journal, month and authors are kept as integer codes. Keyword search
+is then a few dict lookups and set intersections (every query word matches
+as a prefix, so partial words work while typing), and filters and facet
+counts are vectorized over the codes, without rescanning the table's text.
+"""
+import bisect
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from vip_matcher import name_tokens
+
+# Facets offered for refining results: label -> the mask() argument selecting them
+FACETS = {"Journal": "journals", "Author": "authors", "Month": "months"}
+
+# Indexes kept in memory, one per distinct results table
+_INDEX_CACHE_SIZE = 16
+# Filter masks memoized per index (shared, so callers must not modify them)
+_MEMO_SIZE = 256
+
+
+def _codes(values):
+    # Categorical codes (-1 for missing) and their categories
+    categorical = pd.Categorical(values)
+    return np.asarray(categorical.codes), categorical.categories
+
+
+class ResultIndex:
+    """Token and facet index over a results frame (as built by results_table.build_results)."""
+
+    def __init__(self, df):
+        self.size = len(df)
+        postings = {}
+        author_tokens = {}
+        for row, (title, journal, author_names) in enumerate(zip(df["Title"], df["Journal"], df["_author_names"])):
+            tokens = set(name_tokens(title or ""))
+            tokens.update(name_tokens(str(journal)))
+            for name in author_names:
+                if name not in author_tokens:
+                    author_tokens[name] = name_tokens(name)
+                tokens.update(author_tokens[name])
+            for token in tokens:
+                postings.setdefault(token, []).append(row)
+        self._postings = postings
+        self._vocabulary = sorted(postings)
+
+        self._journal_codes, self.journals = _codes(df["Journal"].astype(str))
+        self._month_codes, self.months = _codes(df["Date"].dt.strftime("%Y-%m"))
+        # One entry per (row, author), for author filters and counts
+        authors = df["_author_names"].explode().dropna().reset_index().drop_duplicates()
+        self._author_rows = authors["index"].to_numpy()
+        self._author_codes, self.authors = _codes(authors["_author_names"].to_numpy())
+        self._dates = df["Date"]
+        self._vip = df["_is_vip"].to_numpy(dtype=bool)
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+
+    def search(self, query):
+        """Rows matching every word of `query` (each as a prefix of a title, journal or author token)."""
+        rows = None
+        for token in sorted(set(name_tokens(query)), key=len, reverse=True):
+            start = bisect.bisect_left(self._vocabulary, token)
+            end = bisect.bisect_left(self._vocabulary, token + "\U0010ffff", lo=start)
+            token_rows = set()
+            for word in self._vocabulary[start:end]:
+                token_rows.update(self._postings[word])
+            rows = token_rows if rows is None else rows & token_rows
+            if not rows:
+                break
+        return rows if rows is not None else set(range(self.size))
+
+    def _rows_mask(self, rows):
+        mask = np.zeros(self.size, dtype=bool)
+        mask[list(rows)] = True
+        return mask
+
+    def _code_mask(self, codes, categories, selected):
+        wanted = categories.get_indexer(list(selected))
+        return np.isin(codes, wanted[wanted >= 0])
+
+    def mask(self, days_back=None, query="", journals=(), authors=(), months=(), vip_only=False, today=None):
+        """
+        Boolean array over the table's rows: published in the last
+        `days_back` days, matching `query`, in any of the selected
+        journals/months, with any of the selected authors, VIP papers only.
+        Empty selections don't filter.
+        """
+        key = (days_back, query.strip(), tuple(sorted(journals)), tuple(sorted(authors)),
+               tuple(sorted(months)), vip_only, today)
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+
+        mask = np.ones(self.size, dtype=bool)
+        if days_back is not None:
+            today = today or datetime.now().date()
+            mask &= (self._dates >= pd.Timestamp(today - timedelta(days=days_back))).to_numpy()
+        if vip_only:
+            mask &= self._vip
+        if query.strip():
+            mask &= self._rows_mask(self.search(query))
+        if journals:
+            mask &= self._code_mask(self._journal_codes, self.journals, journals)
+        if months:
+            mask &= self._code_mask(self._month_codes, self.months, months)
+        if authors:
+            with_author = self._code_mask(self._author_codes, self.authors, authors)
+            mask &= self._rows_mask(self._author_rows[with_author])
+
+        with self._lock:
+            self._memo[key] = mask
+            while len(self._memo) > _MEMO_SIZE:
+                self._memo.popitem(last=False)
+        return mask
+
+    def _counts(self, codes, categories, selected_rows):
+        counts = np.bincount(codes[selected_rows & (codes >= 0)], minlength=len(categories))
+        return pd.Series(counts, index=categories)
+
+    def facets(self, limit=50, journals=(), authors=(), months=(), **filters):
+        """
+        Paper counts per journal, author and month over the rows matching the
+        filters (the arguments of mask()). Each facet is counted without its
+        own selection, so other values stay visible while some are chosen.
+        Returns {facet label: Series of counts}; journals and authors are the
+        `limit` most frequent, months newest first.
+        """
+        journal_rows = self.mask(authors=authors, months=months, **filters)
+        author_rows = self.mask(journals=journals, months=months, **filters)
+        month_rows = self.mask(journals=journals, authors=authors, **filters)
+
+        journal_counts = self._counts(self._journal_codes, self.journals, journal_rows)
+        author_counts = self._counts(self._author_codes, self.authors, author_rows[self._author_rows])
+        month_counts = self._counts(self._month_codes, self.months, month_rows)
+        return {
+            "Journal": journal_counts[journal_counts > 0].sort_values(ascending=False, kind="stable").head(limit),
+            "Author": author_counts[author_counts > 0].sort_values(ascending=False, kind="stable").head(limit),
+            "Month": month_counts[month_counts > 0].sort_index(ascending=False),
+        }
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_result_index(key, df):
+    """Returns the ResultIndex for the results table stored under `key`, building it on first use."""
+    with _indexes_lock:
+        if key in _indexes:
+            _indexes.move_to_end(key)
+            return _indexes[key]
+    index = ResultIndex(df)
+    with _indexes_lock:
+        _indexes[key] = index
+        while len(_indexes) > _INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
@@ -0,0 +1,228 @@
+"""
+Builds the results DataFrame from raw OpenAlex works.
+
+Works are formatted straight into per-column lists (no per-row dicts) and
+de-duplicated in a single pass: a work is dropped if its OpenAlex ID, DOI or
+normalized title + first author has already been kept. Walking the works
+oldest-first means the earliest version of each paper is the one kept.
+
+The app shows the table a page at a time: view_positions filters and sorts
+row positions once per view (which the app caches), and only the rows of
+the visible page are sliced out and styled, with VIP highlighting computed
+for the whole page at once.
+
+For searches over several institution groups, each row also records which
+groups its roster authors were at on that paper (the "Institutions"
+column, plus hidden (roster name, group) pairs that institution_matrix
+turns into an author x institution table).
+"""
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from vip_matcher import name_tokens, short_author_id as short_id
+
+RESULT_COLUMNS = [
+    "Title", "Authors", "Date", "Journal", "Link", "_is_vip", "_vip_authors", "_author_names", "_work_id"
+]
+
+# Hidden columns holding tuples, left out of exported files and the displayed table
+EXPORT_EXCLUDED_COLUMNS = ["_author_names", "_affiliations"]
+
+# Orderings offered for the results table: label -> (column, ascending)
+SORT_ORDERS = {
+    "Newest first": ("Date", False),
+    "Oldest first": ("Date", True),
+    "Title (A-Z)": ("Title", True),
+    "Journal (A-Z)": ("Journal", True),
+}
+
+VIP_HIGHLIGHT = "background-color: #FFF9C4"
+
+
+def normalize_doi(doi):
+    """'https://doi.org/10.1/ABC' -> '10.1/abc'"""
+    if not doi:
+        return None
+    doi = doi.strip().lower()
+    for prefix in ("https://doi.org/", "http://doi.org/", "doi:"):
+        if doi.startswith(prefix):
+            return doi[len(prefix):]
+    return doi
+
+
+def title_key(title, authorships):
+    """Hash of the folded title plus first author, or None for untitled works."""
+    title_tokens = name_tokens(title or "")
+    if not title_tokens:
+        return None
+    first_author = ""
+    if authorships:
+        first_author = (authorships[0].get('author') or {}).get('display_name') or ""
+    return hash((title_tokens, name_tokens(first_author)))
+
+
+def empty_results():
+    """An empty frame with the result columns and dtypes."""
+    return build_results([], None)
+
+
+def _group_labels(institution_groups):
+    # Institution ID -> labels of the groups containing it
+    labels = {}
+    for label, institution_ids in institution_groups.items():
+        for institution_id in institution_ids:
+            labels.setdefault(short_id(institution_id), []).append(label)
+    return labels
+
+
+def build_results(works, vip_matcher, roster_authors=None, institution_groups=None):
+    """
+    Formats works into the results table, newest first, one row per paper.
+    The Date column is datetime64 (unparseable dates become NaT).
+    
+    With institution_groups ({label: [institution IDs]}) and roster_authors
+    ({author ID: roster name}), adds the "Institutions" column (groups the
+    roster authors were at on the paper, or any author if none of theirs
+    matches) and the hidden "_affiliations" column of (roster name, group)
+    pairs.
+    """
+    # Oldest first so the first copy of a paper seen is its earliest version.
+    # Works usually arrive sorted newest-first, which Timsort reverses in linear time.
+    ordered = sorted(works, key=lambda work: work.get('publication_date') or "")
+
+    seen_keys = set()
+    titles, authors, dates, journals, links, is_vip, vip_authors = [], [], [], [], [], [], []
+    author_lists, work_ids = [], []
+    labels_by_institution = _group_labels(institution_groups) if institution_groups else None
+    group_order = {label: position for position, label in enumerate(institution_groups or ())}
+    roster_authors = roster_authors or {}
+    institutions, affiliations = [], []
+
+    for work in ordered:
+        authorships = work.get('authorships', [])
+        title = work.get('display_name', 'Untitled')
+
+        keys = [
+            ("id", work.get('id')),
+            ("doi", normalize_doi(work.get('doi'))),
+            ("title", title_key(title, authorships)),
+        ]
+        keys = [key for key in keys if key[1] is not None]
+        if any(key in seen_keys for key in keys):
+            continue
+        seen_keys.update(keys)
+
+        # Check authorship for VIPs to highlight title
+        vip_names = vip_matcher.match_authorships(authorships) if vip_matcher else []
+
+        # Get journal name
+        location = work.get('primary_location') or {}
+        source = location.get('source') or {}
+
+        # Format authors
+        author_names_list = [(a.get('author') or {}).get('display_name', 'Unknown') for a in authorships[:3]]
+        author_str = ", ".join(author_names_list)
+        if len(authorships) > 3:
+            author_str += " et al."
+
+        titles.append(title)
+        authors.append(author_str)
+        dates.append(work.get('publication_date'))
+        journals.append(source.get('display_name', 'Unknown Journal'))
+        links.append(location.get('landing_page_url') or work.get('doi') or '#')
+        is_vip.append(bool(vip_names))
+        vip_authors.append(", ".join(vip_names))
+        author_lists.append(tuple((a.get('author') or {}).get('display_name') or 'Unknown' for a in authorships))
+        work_ids.append(work.get('id'))
+
+        if labels_by_institution is not None:
+            pairs = {}
+            any_labels = set()
+            for authorship in authorships:
+                labels = [
+                    label for inst in authorship.get('institutions') or []
+                    for label in labels_by_institution.get(short_id(inst.get('id')), ())
+                ]
+                any_labels.update(labels)
+                roster_name = roster_authors.get((authorship.get('author') or {}).get('id'))
+                if roster_name:
+                    pairs.update(dict.fromkeys((roster_name, label) for label in labels))
+            work_labels = {label for _, label in pairs} or any_labels
+            institutions.append(", ".join(sorted(work_labels, key=group_order.get)))
+            affiliations.append(tuple(pairs))
+
+    df = pd.DataFrame({
+        "Title": pd.array(titles, dtype=object),
+        "Authors": pd.array(authors, dtype=object),
+        "Date": pd.to_datetime(pd.Series(dates, dtype=object), format='%Y-%m-%d', errors='coerce'),
+        "Journal": pd.Categorical(journals),
+        "Link": pd.array(links, dtype=object),
+        "_is_vip": pd.array(is_vip, dtype=bool), # Hidden column for styling
+        "_vip_authors": pd.array(vip_authors, dtype=object), # Hidden: which VIPs are on the paper
+        "_author_names": pd.Series(author_lists, dtype=object), # Hidden: every author, for in-result search
+        "_work_id": pd.array(work_ids, dtype=object), # Hidden: OpenAlex work ID, for run-to-run diffs
+    }, columns=RESULT_COLUMNS)
+    if labels_by_institution is not None:
+        df["Institutions"] = pd.array(institutions, dtype=object)
+        df["_affiliations"] = pd.Series(affiliations, dtype=object)
+
+    # Newest first for display; reversing the oldest-first order avoids a second sort
+    return df.iloc[::-1].reset_index(drop=True)
+
+
+def institution_matrix(df, institution_labels=None):
+    """
+    Author x institution table for a results frame built with
+    institution_groups: papers per roster author (rows) at each group
+    (columns, in the order of institution_labels if given). Empty if the
+    frame has no affiliation data.
+    """
+    if "_affiliations" not in df.columns or df.empty:
+        return pd.DataFrame(columns=list(institution_labels or []), dtype="int64")
+    pairs = df["_affiliations"].explode().dropna()
+    if pairs.empty:
+        return pd.DataFrame(columns=list(institution_labels or []), dtype="int64")
+    pairs = pd.DataFrame(pairs.tolist(), columns=["Author", "Institution"])
+    matrix = pd.crosstab(pairs["Author"], pairs["Institution"])
+    if institution_labels is not None:
+        matrix = matrix.reindex(columns=list(institution_labels), fill_value=0)
+    matrix.columns.name = None
+    # Most prolific authors first
+    return matrix.loc[matrix.sum(axis=1).sort_values(ascending=False, kind="stable").index]
+
+
+def view_positions(df, days_back=None, sort="Newest first", vip_only=False, today=None, mask=None):
+    """
+    Row positions of a results frame (as built by build_results, newest
+    first) published in the last `days_back` days, optionally VIP papers
+    only and rows where the boolean array `mask` is set (such as a
+    result_index search), in SORT_ORDERS[sort] order. Slice a page with
+    df.take(positions[a:b]).
+    """
+    # (a copy, as the given mask may be shared)
+    mask = pd.Series(True if mask is None else mask, index=df.index, copy=True)
+    if days_back is not None:
+        today = today or datetime.now().date()
+        mask &= df["Date"] >= pd.Timestamp(today - timedelta(days=days_back))
+    if vip_only:
+        mask &= df["_is_vip"]
+    positions = df.index[mask.to_numpy()]
+    column, ascending = SORT_ORDERS[sort]
+    if column == "Date" and not ascending:
+        # Already the frame's order
+        return positions
+    values = df[column].take(positions)
+    if column != "Date":
+        values = values.astype(str).str.casefold()
+    return values.sort_values(ascending=ascending, kind="stable", na_position="last").index
+
+
+def vip_styles(page):
+    """
+    For Styler.apply(..., axis=None): highlights VIP rows of a page of
+    results in one vectorized step instead of a Python call per row.
+    """
+    styles = pd.DataFrame("", index=page.index, columns=page.columns)
+    styles.loc[page["_is_vip"].to_numpy(dtype=bool)] = VIP_HIGHLIGHT
+    return styles
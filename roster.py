@@ -0,0 +1,141 @@
+"""
+Roster ingestion: reads author names from uploaded or local files.
+
+Rows are streamed, so large rosters load in bounded memory: .xlsx/.xlsm via
+openpyxl's read-only mode, .csv/.tsv/.txt line by line (legacy .xls goes
+through pandas). Only the chosen name column is kept. Names are
+Unicode-normalized, "Last, First" is turned into "First Last", and
+duplicates are dropped (first spelling wins). Parsed uploads are cached by
+file hash so Streamlit reruns don't parse the same file again.
+"""
+import csv
+import hashlib
+import io
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from author_cache import normalize_name
+
+ROSTER_EXTENSIONS = (".xlsx", ".xlsm", ".xls", ".csv", ".tsv", ".txt")
+
+# A first row whose cells look like these is a header, not a name
+_HEADER_PATTERN = re.compile(r"\b(names?|authors?|researchers?|faculty|members?|persons?|people)\b", re.IGNORECASE)
+
+# Trailing parts dropped from names ("Smith, Jr." / "Jane Doe, PhD")
+_NAME_SUFFIXES = {"jr", "sr", "ii", "iii", "iv", "phd", "md", "dphil", "msc", "prof"}
+
+# Parsed uploads kept in memory, keyed by (content hash, extension, column)
+_PARSED_CACHE_SIZE = 32
+_parsed = OrderedDict()
+_parsed_lock = threading.Lock()
+
+
+def clean_author_name(raw):
+    """
+    NFKC-normalizes a name, collapses whitespace, drops suffixes such as
+    "Jr." or "PhD" and rewrites "Last, First" as "First Last".
+    Returns "" for blank input.
+    """
+    name = " ".join(unicodedata.normalize("NFKC", str(raw)).split())
+    parts = [part.strip() for part in name.split(",")]
+    parts = [part for part in parts if part and part.rstrip(".").casefold() not in _NAME_SUFFIXES]
+    if len(parts) == 2:
+        last, first = parts
+        return f"{first} {last}"
+    return " ".join(parts)
+
+
+def dedupe_names(names):
+    """Cleans names and drops blanks and duplicates (case/space-insensitive), keeping input order."""
+    unique = {}
+    for raw in names:
+        name = clean_author_name(raw)
+        if name:
+            unique.setdefault(normalize_name(name), name)
+    return list(unique.values())
+
+
+def _extension(filename):
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension not in ROSTER_EXTENSIONS:
+        raise ValueError(f"Unsupported roster file type {extension!r}; use one of {', '.join(ROSTER_EXTENSIONS)}")
+    return extension
+
+
+def _iter_rows(data, extension):
+    """Yields each row of the file as a tuple of cell values."""
+    if extension in (".xlsx", ".xlsm"):
+        import openpyxl
+        workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    elif extension == ".xls":
+        # The legacy format can't be streamed; pandas reads it whole (needs xlrd)
+        import pandas as pd
+        yield from pd.read_excel(io.BytesIO(data), header=None, dtype=str).itertuples(index=False, name=None)
+    else:
+        text = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", newline="")
+        if extension == ".txt":
+            yield from ((line.rstrip("\r\n"),) for line in text)
+        else:
+            yield from csv.reader(text, delimiter="\t" if extension == ".tsv" else ",")
+
+
+def _cell(row, column):
+    value = row[column] if column < len(row) else None
+    if value is None or value != value:  # None or NaN
+        return ""
+    return str(value)
+
+
+def _is_header(row):
+    return any(_HEADER_PATTERN.search(_cell(row, i)) for i in range(len(row)))
+
+
+def roster_columns(data, filename):
+    """
+    Labels of the file's columns for choosing the name column: header cells
+    if the first row is a header, else "Column 1", "Column 2", ...
+    """
+    first_row = next(_iter_rows(data, _extension(filename)), ())
+    if _is_header(first_row):
+        return [_cell(first_row, i) or f"Column {i + 1}" for i in range(len(first_row))]
+    return [f"Column {i + 1}" for i in range(len(first_row))]
+
+
+def parse_roster(data, filename, column=0):
+    """
+    Returns the cleaned, de-duplicated names in `column` (0-based) of a
+    roster file given as bytes. A header row is skipped if present.
+    Parsed files are cached by content hash.
+    """
+    extension = _extension(filename)
+    key = (hashlib.sha256(data).hexdigest(), extension, column)
+    with _parsed_lock:
+        if key in _parsed:
+            _parsed.move_to_end(key)
+            return list(_parsed[key])
+
+    def names():
+        for index, row in enumerate(_iter_rows(data, extension)):
+            if index == 0 and _is_header(row):
+                continue
+            yield _cell(row, column)
+
+    result = tuple(dedupe_names(names()))
+    with _parsed_lock:
+        _parsed[key] = result
+        while len(_parsed) > _PARSED_CACHE_SIZE:
+            _parsed.popitem(last=False)
+    return list(result)
+
+
+def read_roster(path, column=0):
+    """Reads a roster file from disk; see parse_roster."""
+    with open(path, "rb") as f:
+        return parse_roster(f.read(), path, column)
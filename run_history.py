@@ -0,0 +1,169 @@
+"""
+History of past searches, for "what's new since last time" digests.
+
+Each recorded run stores, per (roster, institution set), the OpenAlex work
+IDs in its results with a 64-bit fingerprint of each paper's displayed
+fields. The next search is compared against the last recorded run with a
+set difference on work IDs plus a fingerprint comparison, so the digest
+holds only papers that are new, or whose title, authors, date, journal,
+link or VIPs changed. Only the last HISTORY_RUNS_KEPT runs per roster are
+kept, so the file stays small however often a nightly job runs.
+"""
+import hashlib
+import os
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from author_cache import normalize_name
+from sqlite_store import CACHE_DIR, SQLiteStore, institutions_key
+
+# Runs kept per (roster, institution set)
+HISTORY_RUNS_KEPT = int(os.environ.get("CHEWIE_HISTORY_RUNS_KEPT", 8))
+
+# Result columns a paper's fingerprint covers
+FINGERPRINT_COLUMNS = ["Title", "Authors", "Date", "Journal", "Link", "_vip_authors"]
+
+# Values of the digest's "Change" column
+NEW = "new"
+CHANGED = "changed"
+
+
+def roster_key(author_names):
+    """Order- and case-insensitive key for a roster."""
+    names = sorted({normalize_name(name) for name in author_names if name.strip()})
+    return hashlib.sha256("\n".join(names).encode("utf-8")).hexdigest()[:32]
+
+
+def paper_fingerprints(df):
+    """Series of int64 fingerprints of each paper's displayed fields, indexed by work ID."""
+    df = df[df["_work_id"].notna()]
+    hashes = pd.util.hash_pandas_object(df[FINGERPRINT_COLUMNS], index=False)
+    # SQLite integers are signed 64-bit
+    return pd.Series(hashes.to_numpy().view("int64"), index=df["_work_id"].to_numpy())
+
+
+class RunHistory(SQLiteStore):
+    """SQLite-backed run history. Safe to share across threads."""
+
+    def __init__(self, path=None, runs_kept=HISTORY_RUNS_KEPT):
+        super().__init__(path or os.path.join(CACHE_DIR, "history.sqlite"))
+        self.runs_kept = runs_kept
+        with self._connect() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    roster TEXT NOT NULL,
+                    institutions TEXT NOT NULL,
+                    run_at TEXT NOT NULL,
+                    authors INTEGER NOT NULL,
+                    papers INTEGER NOT NULL,
+                    new_papers INTEGER NOT NULL,
+                    changed_papers INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS runs_by_roster ON runs (roster, institutions, run_id);
+                CREATE TABLE IF NOT EXISTS run_papers (
+                    run_id INTEGER NOT NULL,
+                    work_id TEXT NOT NULL,
+                    fingerprint INTEGER NOT NULL,
+                    PRIMARY KEY (run_id, work_id)
+                ) WITHOUT ROWID;
+                """
+            )
+
+    def runs(self, author_names, institution_ids, limit=20):
+        """Recorded runs for a roster at an institution set, newest first, as dicts."""
+        rows = self._connect().execute(
+            "SELECT run_id, run_at, authors, papers, new_papers, changed_papers FROM runs "
+            "WHERE roster = ? AND institutions = ? ORDER BY run_id DESC LIMIT ?",
+            (roster_key(author_names), institutions_key(institution_ids), limit),
+        ).fetchall()
+        fields = ("run_id", "run_at", "authors", "papers", "new_papers", "changed_papers")
+        return [dict(zip(fields, row)) for row in rows]
+
+    def last_run(self, author_names, institution_ids):
+        """The most recent run for a roster at an institution set, or None."""
+        runs = self.runs(author_names, institution_ids, limit=1)
+        return runs[0] if runs else None
+
+    def _fingerprints(self, run_id):
+        rows = self._connect().execute(
+            "SELECT work_id, fingerprint FROM run_papers WHERE run_id = ?", (run_id,)
+        ).fetchall()
+        return pd.Series(
+            [fingerprint for _, fingerprint in rows], index=[work_id for work_id, _ in rows], dtype="int64"
+        )
+
+    def changes(self, author_names, institution_ids, df):
+        """
+        Papers in results frame `df` that are new or changed since the last
+        recorded run for this roster and institution set (all of them if
+        there is none), with a "Change" column. Returns (changes, last run
+        dict or None).
+        """
+        last = self.last_run(author_names, institution_ids)
+        current = paper_fingerprints(df)
+        if last is None:
+            change = pd.Series(NEW, index=current.index)
+        else:
+            previous = self._fingerprints(last["run_id"])
+            seen = current.index.isin(previous.index)
+            change = pd.Series(NEW, index=current.index)
+            change[seen] = CHANGED
+            # Papers seen before with the same fingerprint are unchanged
+            unchanged = pd.Series(False, index=current.index)
+            unchanged[seen] = previous.reindex(current.index[seen]).to_numpy() == current[seen].to_numpy()
+            change = change[~unchanged.to_numpy()]
+        changed = df[df["_work_id"].isin(change.index)].copy()
+        changed.insert(0, "Change", changed["_work_id"].map(change))
+        return changed.reset_index(drop=True), last
+
+    def record(self, author_names, institution_ids, df, changes=None, run_at=None):
+        """
+        Records a run's results as the new baseline for this roster and
+        institution set. `changes` (from changes()) sets the run's new and
+        changed counts. Older runs past runs_kept are dropped. Returns the run ID.
+        """
+        roster = roster_key(author_names)
+        inst_key = institutions_key(institution_ids)
+        fingerprints = paper_fingerprints(df)
+        fingerprints = fingerprints[~fingerprints.index.duplicated()]
+        counts = changes["Change"].value_counts() if changes is not None else {}
+        with self._connect() as conn:
+            run_id = conn.execute(
+                "INSERT INTO runs (roster, institutions, run_at, authors, papers, new_papers, changed_papers) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    roster, inst_key, run_at or datetime.now().isoformat(timespec="seconds"),
+                    len({normalize_name(name) for name in author_names if name.strip()}), len(fingerprints),
+                    int(counts.get(NEW, 0)), int(counts.get(CHANGED, 0)),
+                ),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO run_papers (run_id, work_id, fingerprint) VALUES (?, ?, ?)",
+                zip([run_id] * len(fingerprints), fingerprints.index, fingerprints.tolist()),
+            )
+            stale = [row[0] for row in conn.execute(
+                "SELECT run_id FROM runs WHERE roster = ? AND institutions = ? ORDER BY run_id DESC LIMIT -1 OFFSET ?",
+                (roster, inst_key, self.runs_kept),
+            )]
+            if stale:
+                placeholders = ",".join("?" * len(stale))
+                conn.execute(f"DELETE FROM run_papers WHERE run_id IN ({placeholders})", stale)
+                conn.execute(f"DELETE FROM runs WHERE run_id IN ({placeholders})", stale)
+        return run_id
+
+
+_default_history = None
+_default_history_lock = threading.Lock()
+
+
+def get_run_history():
+    """Returns the process-wide RunHistory instance."""
+    global _default_history
+    with _default_history_lock:
+        if _default_history is None:
+            _default_history = RunHistory()
+        return _default_history
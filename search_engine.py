@@ -0,0 +1,761 @@
+"""
+Search pipeline for Chewie, independent of the Streamlit UI.
+
+`get_recent_papers` resolves roster names to OpenAlex author IDs and fetches
+their recent works at a set of institutions. It is used by app.py and by the
+headless batch runner in chewie_cli.py.
+"""
+import functools
+import logging
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from datetime import datetime, timedelta
+
+import requests
+
+from author_cache import get_author_cache
+from name_matcher import NameIndex, surname_key
+from openalex_client import AUTHORS_URL, WORKS_URL, AUTHOR_FIELDS, WORK_FIELDS, MAX_WORKERS, get_json
+from result_cache import get_result_cache, search_key
+from results_table import build_results, empty_results
+from vip_matcher import VIPMatcher, name_tokens, short_author_id as short_id
+from works_store import get_works_store
+
+logger = logging.getLogger(__name__)
+
+# Time horizons offered in the UI, in days
+TIME_HORIZON_DAYS = {
+    "1 Month": 30,
+    "3 Months": 90,
+    "6 Months": 180,
+    "1 Year": 365
+}
+
+# VIP Authors List
+VIP_AUTHORS = {
+    "Chunlei Liu", "Jennifer Listgarten", "Jun-Chau Chien", "Jack Gallant", 
+    "Preeya Khanna", "Doris Tsao", "William Jagust", "Gül Dölen", 
+    "Richard Ivry", "Markita Landry", "John G. Flannery", "James Olzmann", 
+    "Roberto Zoncu", "Fyodor Urnov", "James Nuñez", "Margaux Pinney", 
+    "Kathleen Collins", "Xavier Darzacq", "Michael Rape", "David Schaffer", 
+    "Ehud Isacoff", "David Nguyen", "Doug Koshland", "Robert Tjian", 
+    "Daniel Portnoy", "David Savage", "Peter Sudmant", "Britt Glaunsinger", 
+    "Andrea Gomez", "Robert Saxton", "Jennifer A. Doudna", "Daniel K. Nomura", 
+    "Ashok Ajoy", "Kevan Shokat", "Peidong Yang", "Matthew B. Francis", 
+    "Jennifer Bergner", "Jay T. Groves", "Omar Yaghi", "Karthik Shekhar", 
+    "Rebecca Bart", "Adam Arkin", "Kevin Healy", "Phillip Messersmith", 
+    "John Dueber", "Dorian Liepmann", "Derfogail Delcassian", "Rikky Muller"
+}
+
+# Optional VIP list file (one name per line, optionally "<name>\t<OpenAlex ID>")
+# that replaces the built-in list above
+VIP_FILE = os.environ.get("CHEWIE_VIP_FILE")
+
+@functools.lru_cache(maxsize=None)
+def get_vip_matcher():
+    """Compiles the VIP list once per process."""
+    if VIP_FILE:
+        return VIPMatcher.from_file(VIP_FILE)
+    return VIPMatcher(VIP_AUTHORS)
+
+def search_authors(surname, institutions_str, stats=None):
+    """
+    Returns every author at the institutions whose name (or alternative
+    name) contains `surname`, following cursor pages up to
+    AUTHOR_SEARCH_MAX_PAGES. Raises requests.exceptions.RequestException if
+    a page fails.
+    """
+    authors = []
+    cursor = '*'
+    for _ in range(AUTHOR_SEARCH_MAX_PAGES):
+        params = {
+            'filter': f'display_name.search:{surname},last_known_institutions.id:{institutions_str}',
+            'per_page': AUTHORS_PER_PAGE,
+            'cursor': cursor
+        }
+        data = get_json(AUTHORS_URL, params=params, select=AUTHOR_FIELDS, stats=stats)
+        results = data.get('results', [])
+        authors.extend(results)
+        cursor = data.get('meta', {}).get('next_cursor')
+        if not cursor or not results:
+            break
+    return authors
+
+def resolve_author(author_name, institutions_str, stats=None):
+    """
+    Looks up OpenAlex author IDs for one name at the given institutions.
+    Returns the list of matching IDs, best match first (empty if not found).
+    Raises requests.exceptions.RequestException if the lookup fails.
+    """
+    # Search by surname to cast a wide net, then match the full name locally
+    # (accents, initials and alternative spellings, see name_matcher)
+    surname = surname_key(author_name)
+    if not surname:
+        return []
+    return NameIndex(search_authors(surname, institutions_str, stats=stats)).match(author_name)
+
+def fetch_works_page(filter_str, cursor, stats=None):
+    """
+    Fetches one page of works for a filter. Returns (works, next_cursor);
+    next_cursor is None on the last page.
+    """
+    params = {
+        'filter': filter_str,
+        'sort': 'publication_date:desc',
+        'per_page': 200,
+        'cursor': cursor
+    }
+    data = get_json(WORKS_URL, params=params, select=WORK_FIELDS, stats=stats)
+    return data.get('results', []), data.get('meta', {}).get('next_cursor')
+
+def fetch_work(work_id, stats=None):
+    """
+    Fetches one work by ID. Unlike list pages, which carry at most 100
+    authorships per work, this lists every author.
+    """
+    return get_json(f"{WORKS_URL}/{short_id(work_id)}", select=WORK_FIELDS, stats=stats)
+
+def _fetch_full_works(work_ids, stats, warn, on_work):
+    """
+    Fetches works by ID concurrently (see fetch_work), calling
+    on_work(work ID, work) from the calling thread as each arrives. Returns
+    the IDs that could not be fetched.
+    """
+    failed = []
+    if work_ids:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = {executor.submit(fetch_work, work_id, stats): work_id for work_id in work_ids}
+            for future in as_completed(futures):
+                try:
+                    work = future.result()
+                except requests.exceptions.RequestException:
+                    failed.append(futures[future])
+                    continue
+                on_work(futures[future], work)
+    if failed:
+        warn(f"Could not fetch the full author list of {len(failed)} work(s) with over 100 authors")
+    return failed
+
+def _complete_authorships(works, stats, warn, completed=None):
+    """
+    Replaces works whose authorship list was truncated (is_authors_truncated)
+    with the full work, fetched concurrently, so authors past the first 100
+    are linked like any other. `completed` ({work ID: full work}) saves
+    refetching works already completed in the same search. Returns (works,
+    False if some full works could not be fetched).
+    """
+    if completed is None:
+        completed = {}
+    to_fetch = list(dict.fromkeys(
+        work['id'] for work in works
+        if work.get('is_authors_truncated') and work.get('id') and work['id'] not in completed
+    ))
+    failed = _fetch_full_works(to_fetch, stats, warn, completed.__setitem__)
+    return [completed.get(work.get('id'), work) if work.get('is_authors_truncated') else work for work in works], not failed
+
+# Query planning: for big rosters it can be cheaper to stream every work at the
+# institution in the window once and match the roster locally than to search
+# each name. Below this many estimated author-first requests, don't bother probing.
+INSTITUTION_PLAN_MIN_REQUESTS = 40
+# Author IDs per verification request in the institution-first plan
+VERIFY_BATCH_SIZE = 50
+# Share of names assumed to need a regular /authors search in the institution-first plan
+FALLBACK_FRACTION = 0.1
+# Share of works assumed to list over 100 authors, each needing its own
+# request for the full author list in the institution-first plan
+TRUNCATED_FRACTION = 0.01
+# Author search paging: candidates per page, and a cap on pages per surname
+AUTHORS_PER_PAGE = 200
+AUTHOR_SEARCH_MAX_PAGES = 5
+# Batch size to prevent URL length errors (400 Bad Request)
+# OpenAlex allows OR queries but long URLs fail. 25-50 is a safe chunk size.
+AUTHOR_CHUNK_SIZE = 25
+WORKS_PER_PAGE = 200
+
+def _works_event(works, batches_done, total_batches, pages_fetched):
+    return {
+        "type": "works",
+        "works": works,
+        "batches_done": batches_done,
+        "total_batches": total_batches,
+        "pages_fetched": pages_fetched,
+    }
+
+def _end_phase(stats, name, started):
+    """Records the phase that began at `started` and returns the start time of the next one."""
+    now = time.perf_counter()
+    if stats is not None:
+        stats.record_phase(name, now - started)
+    return now
+
+def _walk_cursors(filters, stats, warn, on_filter_done=None, keep=None):
+    """
+    Generator that fetches every page of every filter with cursor pagination.
+    Each page is its own task, so at most MAX_WORKERS pages are in flight
+    across all filters; the next page of a filter is queued as soon as its
+    cursor arrives. Yields a "works" event per fetched page and returns
+    (list of works per filter, set of filter indexes that failed).
+    
+    If given, on_filter_done(index, works) is called as soon as a filter's
+    last page arrives, so its results can be kept even if the walk is stopped,
+    and keep(page works) picks the works of each page to hold on to (and
+    pass on); the others are dropped as soon as their page arrives.
+    """
+    works_by_filter = [[] for _ in filters]
+    failed = set()
+    filters_done = 0
+    pages_fetched = 0
+    
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    try:
+        pending = {
+            executor.submit(fetch_works_page, filter_str, "*", stats): index
+            for index, filter_str in enumerate(filters)
+        }
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            new_works = []
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    page_works, next_cursor = future.result()
+                except requests.exceptions.RequestException as e:
+                    warn(f"Error fetching batch of works: {str(e)}")
+                    failed.add(index)
+                    filters_done += 1
+                    continue
+                
+                pages_fetched += 1
+                kept = page_works if keep is None else keep(page_works)
+                works_by_filter[index].extend(kept)
+                new_works.extend(kept)
+                if next_cursor and page_works:
+                    pending[executor.submit(fetch_works_page, filters[index], next_cursor, stats)] = index
+                else:
+                    filters_done += 1
+                    if on_filter_done:
+                        on_filter_done(index, works_by_filter[index])
+            
+            yield _works_event(new_works, filters_done, len(filters), pages_fetched)
+    finally:
+        # If the consumer stops early, drop queued pages instead of fetching them
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    return works_by_filter, failed
+
+def _resolve_by_search(names, institutions_str, stats, resolved_ids=None):
+    """
+    Generator that resolves names concurrently with /authors searches,
+    yielding an "authors" event as each lookup finishes. Names sharing a
+    surname share one search. Returns {name: [author IDs]}, with None for
+    lookups that failed. Results are added to `resolved_ids` (a new dict by
+    default) as they arrive, so a caller that stops the generator early
+    keeps the finished lookups.
+    """
+    def lookup(surname):
+        try:
+            index = NameIndex(search_authors(surname, institutions_str, stats=stats))
+        except requests.exceptions.RequestException:
+            # Failed lookups are reported as missing but never cached
+            return None
+        return index.match_many(by_surname[surname])
+    
+    if resolved_ids is None:
+        resolved_ids = {}
+    by_surname = {}
+    for name in names:
+        surname = surname_key(name)
+        if surname:
+            by_surname.setdefault(surname, []).append(name)
+        else:
+            resolved_ids[name] = []
+    if not by_surname:
+        return resolved_ids
+    done = len(names) - sum(len(group) for group in by_surname.values())
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    try:
+        futures = {executor.submit(lookup, surname): surname for surname in by_surname}
+        for future in as_completed(futures):
+            group = by_surname[futures[future]]
+            matches = future.result()
+            for name in group:
+                resolved_ids[name] = None if matches is None else matches[name]
+            done += len(group)
+            yield {"type": "authors", "resolved": done, "total": len(names)}
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return resolved_ids
+
+def count_institution_works(institutions_str, start_date, stats=None):
+    """Cheap probe: how many works the institutions have in the window (meta.count)."""
+    params = {
+        'filter': f"authorships.institutions.id:{institutions_str},publication_date:>{start_date}",
+        'per_page': 1
+    }
+    data = get_json(WORKS_URL, params=params, select=("id",), stats=stats)
+    return data.get('meta', {}).get('count', 0)
+
+def choose_plan(num_to_resolve, num_authors, institutions_str, start_date, stats=None):
+    """
+    Picks 'author' (search each name, then fetch works per author chunk) or
+    'institution' (stream all institution works once, match names locally)
+    by estimated request count. Returns (plan, estimated institution works
+    or None if not probed).
+    """
+    author_cost = num_to_resolve + math.ceil(num_authors / AUTHOR_CHUNK_SIZE)
+    if author_cost < INSTITUTION_PLAN_MIN_REQUESTS:
+        return "author", None
+    try:
+        works_count = count_institution_works(institutions_str, start_date, stats=stats)
+    except requests.exceptions.RequestException:
+        return "author", None
+    institution_cost = (
+        1
+        + math.ceil(works_count / WORKS_PER_PAGE)
+        + math.ceil(num_to_resolve / VERIFY_BATCH_SIZE)
+        + math.ceil(num_to_resolve * FALLBACK_FRACTION)
+        + math.ceil(works_count * TRUNCATED_FRACTION)
+    )
+    return ("institution" if institution_cost < author_cost else "author"), works_count
+
+def _date_slices(start_date, num_slices):
+    """
+    Splits the window after start_date into filter clauses for num_slices
+    date ranges. The last range is open-ended, like publication_date:>start.
+    """
+    first_day = datetime.strptime(start_date, '%Y-%m-%d').date() + timedelta(days=1)
+    total_days = max(1, (datetime.now().date() - first_day).days + 1)
+    num_slices = max(1, min(num_slices, total_days))
+    step = total_days / num_slices
+    clauses = []
+    for i in range(num_slices):
+        slice_start = first_day + timedelta(days=round(i * step))
+        clause = f"from_publication_date:{slice_start.isoformat()}"
+        if i < num_slices - 1:
+            slice_end = first_day + timedelta(days=round((i + 1) * step) - 1)
+            clause += f",to_publication_date:{slice_end.isoformat()}"
+        clauses.append(clause)
+    return clauses
+
+def fetch_institution_works(institutions_str, start_date, works_count, stats, warn, keep):
+    """
+    Generator that streams every work at the institutions published after
+    start_date, yielding "works" events per page. The window is cut into date
+    slices walked in parallel, each with its own cursor. Each page goes
+    through keep(works), which returns the works to hold on to, so memory
+    follows what is kept rather than the institution's output. Works listing
+    over 100 authors reach keep as the full work, fetched once the stream is
+    done. Returns (kept works, complete) where complete is False if any slice
+    or full work failed.
+    """
+    num_slices = min(MAX_WORKERS * 2, max(1, math.ceil((works_count or 0) / WORKS_PER_PAGE)))
+    filters = [
+        f"authorships.institutions.id:{institutions_str},{clause}"
+        for clause in _date_slices(start_date, num_slices)
+    ]
+    truncated_ids = []
+    
+    def keep_page(works):
+        truncated_ids.extend(work['id'] for work in works if work.get('is_authors_truncated') and work.get('id'))
+        return keep([work for work in works if not work.get('is_authors_truncated')])
+    
+    works_by_slice, failed = yield from _walk_cursors(filters, stats, warn, keep=keep_page)
+    kept = [work for slice_works in works_by_slice for work in slice_works]
+    if failed:
+        return kept, False
+    failed_ids = _fetch_full_works(
+        list(dict.fromkeys(truncated_ids)), stats, warn, lambda work_id, work: kept.extend(keep([work]))
+    )
+    return kept, not failed_ids
+
+def _roster_filter(names, tracked_ids):
+    """
+    For streaming the institution's works: returns (keep, index), where
+    keep(works) returns the works listing an author in `tracked_ids` or one
+    whose name contains the surname of one of `names`. Those authors are
+    added to `tracked_ids` and to `index`, a NameIndex to match `names`
+    against. Authors named otherwise can't match any of `names` (see
+    name_matcher), so the other works can be dropped as they arrive.
+    """
+    surnames = {surname_key(name) for name in names} - {""}
+    index = NameIndex()
+    
+    def keep(works):
+        kept = []
+        for work in works:
+            listed = False
+            for authorship in work.get('authorships') or []:
+                author = authorship.get('author') or {}
+                author_id = author.get('id')
+                if not author_id:
+                    continue
+                if not surnames.isdisjoint(name_tokens(author.get('display_name') or "")):
+                    index.add(author_id, [author.get('display_name')])
+                    tracked_ids.add(author_id)
+                listed = listed or author_id in tracked_ids
+            if listed:
+                kept.append(work)
+        return kept
+    
+    return keep, index
+
+def _resolve_from_works(names, index, institutions_str, stats, resolved_ids=None, searched_ids=None):
+    """
+    Generator for institution-first author resolution. Matches names against
+    `index`, a NameIndex of the authors on the institution's works (see
+    _roster_filter), using the same rules as resolve_author, then confirms
+    the candidates' last known institution in batched
+    /authors?filter=id:... calls.
+    Names without a confirmed match fall back to a regular search.
+    Yields "authors" events and returns/fills resolved_ids like _resolve_by_search.
+    
+    Names matched on works only find the authors with works in this window,
+    so those results depend on the window; the fallback's results don't, and
+    are also added to `searched_ids` as they arrive.
+    """
+    candidates = index.match_many(names)
+    
+    # Confirm last_known_institutions for every candidate, 50 IDs per request
+    to_verify = list(dict.fromkeys(author_id for ids in candidates.values() for author_id in ids))
+    batches = [to_verify[i:i + VERIFY_BATCH_SIZE] for i in range(0, len(to_verify), VERIFY_BATCH_SIZE)]
+    
+    def verify(batch):
+        params = {
+            'filter': f"id:{'|'.join(batch)},last_known_institutions.id:{institutions_str}",
+            'per_page': len(batch)
+        }
+        try:
+            data = get_json(AUTHORS_URL, params=params, select=AUTHOR_FIELDS, stats=stats)
+        except requests.exceptions.RequestException:
+            return set()
+        return {result.get('id') for result in data.get('results', [])}
+    
+    verified = set()
+    if batches:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            for batch_verified in executor.map(verify, batches):
+                verified |= batch_verified
+    
+    if resolved_ids is None:
+        resolved_ids = {}
+    unmatched = []
+    for name in names:
+        ids = [author_id for author_id in candidates.get(name, []) if author_id in verified]
+        if ids:
+            resolved_ids[name] = ids
+        else:
+            unmatched.append(name)
+    yield {"type": "authors", "resolved": len(resolved_ids), "total": len(names)}
+    searched_ids = yield from _resolve_by_search(unmatched, institutions_str, stats, searched_ids)
+    resolved_ids.update(searched_ids)
+    return resolved_ids
+
+def _sync_author_works(author_ids, university_ids, institutions_str, start_date, works_store,
+                       stats, warn):
+    """
+    Generator for the author-first works fetch; yields "works" events. Only
+    asks OpenAlex for what the local works store doesn't already have: authors
+    synced before are fetched from their watermark onwards, new ones over the
+    full window. Authors sharing a start date are chunked together.
+    """
+    sync_plan = works_store.plan_sync(author_ids, university_ids, start_date)
+    
+    chunk_filters = []
+    chunk_authors = []
+    for since_date, since_author_ids in sorted(sync_plan.items()):
+        for i in range(0, len(since_author_ids), AUTHOR_CHUNK_SIZE):
+            chunk_ids = since_author_ids[i:i + AUTHOR_CHUNK_SIZE]
+            author_ids_str = "|".join(chunk_ids)
+            
+            # Filter by author IDs, publication date, and institution
+            chunk_filters.append(
+                f"authorships.author.id:{author_ids_str},"
+                f"authorships.institutions.id:{institutions_str},"
+                f"publication_date:>{since_date}"
+            )
+            chunk_authors.append(chunk_ids)
+    
+    # Merge each chunk into the store as soon as it is complete, so a stopped
+    # search doesn't fetch it again. Watermarks only move forward for chunks
+    # that were fetched completely, so failed batches are retried in full;
+    # that includes the full author lists of works with over 100 authors,
+    # without which a chunk author past the listed ones would lose the work.
+    completed = {}
+    
+    def store_chunk(index, chunk_works):
+        chunk_works, complete = _complete_authorships(chunk_works, stats, warn, completed)
+        works_store.add_works(chunk_works, chunk_authors[index], university_ids)
+        if complete:
+            works_store.mark_synced(chunk_authors[index], university_ids, start_date)
+    
+    works_by_chunk, failed_chunks = yield from _walk_cursors(chunk_filters, stats, warn, store_chunk)
+    for index in failed_chunks:
+        chunk_works, _ = _complete_authorships(works_by_chunk[index], stats, warn, completed)
+        works_store.add_works(chunk_works, chunk_authors[index], university_ids)
+
+def _window_scope(days_back):
+    """Author cache scope for names matched on the works of a `days_back`-day window."""
+    return f"works-{days_back}d"
+
+def _clean_author_names(author_names):
+    """Accepts a list of names or a comma-separated string; drops blanks."""
+    if isinstance(author_names, str):
+        author_names = author_names.split(',')
+    return [name.strip() for name in author_names if name.strip()]
+
+def _university_id_list(university_id):
+    """Accepts one institution ID or a list of them."""
+    if isinstance(university_id, str):
+        return [university_id]
+    return list(university_id)
+
+def iter_recent_papers(university_id, author_names, days_back, university_display_name=None,
+                       stats=None, on_warning=None, plan="auto", institution_groups=None):
+    """
+    Streaming form of get_recent_papers. A generator of event dicts:
+    
+    - {"type": "authors", "resolved", "total"}: author resolution progress
+    - {"type": "works", "works", "batches_done", "total_batches", "pages_fetched"}:
+      newly arrived raw works for the resolved authors plus page progress;
+      events with total_batches 0 carry works read from the local store
+    - {"type": "result", "df", "missing_authors"}: the final, deduplicated
+      table; always the last event
+    
+    Arguments are as for get_recent_papers.
+    """
+    warn = on_warning or logger.warning
+    
+    # Calculate the date (YYYY-MM-DD) - 90 days ago
+    start_date = (datetime.now() - timedelta(days=days_back)).strftime('%Y-%m-%d')
+    
+    authors_list = _clean_author_names(author_names)
+    if not authors_list:
+        yield {"type": "result", "df": empty_results(), "missing_authors": []}
+        return
+    
+    university_ids = _university_id_list(university_id)
+    # Create pipe-separated string for OR query
+    institutions_str = "|".join(university_ids)
+
+    # Names resolved by earlier searches (including known misses) come from the
+    # on-disk cache, then names an earlier institution-first search over the
+    # same window matched on its works; only the rest need resolving.
+    phase_started = time.perf_counter()
+    author_cache = get_author_cache()
+    window_scope = _window_scope(days_back)
+    cached_ids = author_cache.get_many(authors_list, university_ids)
+    cached_ids.update(author_cache.get_many(
+        [name for name in authors_list if name not in cached_ids], university_ids, window_scope
+    ))
+    to_resolve = [name for name in authors_list if name not in cached_ids]
+    yield {"type": "authors", "resolved": len(cached_ids), "total": len(authors_list)}
+    
+    works_count = None
+    if plan == "auto":
+        plan, works_count = choose_plan(len(to_resolve), len(authors_list), institutions_str, start_date, stats)
+    elif plan == "institution":
+        # A forced institution plan still needs the probe to size its date
+        # slices; like choose_plan, fall back to the author plan if it fails
+        try:
+            works_count = count_institution_works(institutions_str, start_date, stats=stats)
+        except requests.exceptions.RequestException as e:
+            warn(f"Could not count institution works ({e}); falling back to per-author search.")
+            plan = "author"
+    if stats is not None:
+        stats.plan = plan
+    phase_started = _end_phase(stats, "plan", phase_started)
+    
+    institution_works = None
+    if plan == "institution":
+        # Only works listing a cached roster author or someone who could be a
+        # roster name are kept, matched as pages arrive. They aren't
+        # attributed to roster authors yet, so only progress is passed on.
+        streamed_ids = {author_id for ids in cached_ids.values() for author_id in ids}
+        keep, candidates = _roster_filter(to_resolve, streamed_ids)
+        fetch = fetch_institution_works(institutions_str, start_date, works_count, stats, warn, keep)
+        institution_works, complete = yield from _progress_only(fetch)
+        if not complete:
+            warn("Could not fetch all institution works; falling back to per-author search.")
+            plan, institution_works = "author", None
+            if stats is not None:
+                stats.plan = plan
+        phase_started = _end_phase(stats, "fetch_institution_works", phase_started)
+
+    # STEP 1: Get Author IDs
+    # Lookups are cached even if the search is stopped part-way through.
+    # Names matched on the institution's works miss namesakes without works
+    # in this window, so they are only cached for searches over the same
+    # window; that is enough for reruns to skip this step and, with the
+    # watermarks set below, to sync incrementally on the author plan.
+    resolved = {}
+    searched = resolved if plan == "author" else {}
+    try:
+        if plan == "institution":
+            yield from _resolve_from_works(
+                to_resolve, candidates, institutions_str, stats, resolved, searched
+            )
+        else:
+            yield from _resolve_by_search(to_resolve, institutions_str, stats, resolved)
+    finally:
+        author_cache.set_many(
+            {name: ids for name, ids in searched.items() if ids is not None},
+            university_ids
+        )
+        if plan == "institution":
+            author_cache.set_many(
+                {name: ids for name, ids in resolved.items() if ids and name not in searched},
+                university_ids, window_scope
+            )
+    resolved_ids = {name: resolved[name] for name in to_resolve}
+    
+    failed_lookups = [name for name, ids in resolved_ids.items() if ids is None]
+    if failed_lookups:
+        warn(
+            f"Could not look up {len(failed_lookups)} author(s) after retries; "
+            f"they are listed as missing: {', '.join(failed_lookups)}"
+        )
+    
+    # Assemble in roster order so the output is deterministic
+    author_ids = []
+    missing_authors = []
+    roster_authors = {}
+    for author_name in authors_list:
+        matched_ids = cached_ids[author_name] if author_name in cached_ids else resolved_ids[author_name]
+        if matched_ids:
+            author_ids.extend(matched_ids)
+            for author_id in matched_ids:
+                roster_authors.setdefault(author_id, author_name)
+        else:
+            missing_authors.append(author_name)
+    
+    phase_started = _end_phase(stats, "resolve_authors", phase_started)
+    if not author_ids:
+        yield {"type": "result", "df": empty_results(), "missing_authors": missing_authors}
+        return
+    
+    
+    # STEP 2: Get Papers using Author IDs
+    works_store = get_works_store()
+    to_sync = author_ids
+    if plan == "institution":
+        # The stream kept every work of the authors it tracked; the store keeps
+        # those linked to resolved ones. Authors only found by /authors search
+        # (named on their works without the roster surname) weren't tracked,
+        # so their works are fetched per author as in the author plan.
+        works_store.add_works(institution_works, author_ids, university_ids)
+        institution_works = None
+        works_store.mark_synced(
+            [author_id for author_id in author_ids if author_id in streamed_ids], university_ids, start_date
+        )
+        to_sync = [author_id for author_id in author_ids if author_id not in streamed_ids]
+    # Show what is already stored, then each new page as it arrives
+    works = works_store.get_works(author_ids, university_ids, start_date)
+    yield _works_event(works, 0, 0, 0)
+    if to_sync:
+        yield from _sync_author_works(
+            to_sync, university_ids, institutions_str, start_date, works_store, stats, warn
+        )
+        works = None
+    phase_started = _end_phase(stats, "fetch_works", phase_started)
+    
+    # Process all stored works in the window (newest first, one copy per work);
+    # if nothing was synced, the preview read already has them
+    if works is None:
+        works = works_store.get_works(author_ids, university_ids, start_date)
+    phase_started = _end_phase(stats, "merge_store", phase_started)
+        
+    # Format and deduplicate (keeps the earliest version of each paper); with
+    # several institution groups, works are split between them locally
+    df = build_results(works, get_vip_matcher(), roster_authors, institution_groups)
+    _end_phase(stats, "build_results", phase_started)
+
+    yield {"type": "result", "df": df, "missing_authors": missing_authors}
+
+def iter_shared_recent_papers(university_id, author_names, days_back, university_display_name=None,
+                              stats=None, on_warning=None, plan="auto", institution_groups=None,
+                              cancelled=None):
+    """
+    iter_recent_papers through the process-wide result cache. A search that
+    already finished today is answered from memory, and one already running
+    in another session is waited for instead of repeated; otherwise the search
+    streams as usual and its result is shared. The "result" event also
+    carries the cache "key", which sessions can keep instead of the table.
+    
+    If `cancelled` (a threading.Event) is set while waiting for another
+    session's search, raises concurrent.futures.CancelledError.
+    """
+    key = search_key(
+        _university_id_list(university_id), _clean_author_names(author_names), days_back,
+        institution_groups=institution_groups
+    )
+    result_cache = get_result_cache()
+    phase_started = time.perf_counter()
+    cached = result_cache.claim(key, cancelled)
+    if cached is not None:
+        _end_phase(stats, "shared_results", phase_started)
+        df, missing_authors = cached
+        yield {"type": "result", "df": df, "missing_authors": missing_authors, "key": key}
+        return
+    
+    try:
+        events = iter_recent_papers(
+            university_id, author_names, days_back, university_display_name,
+            stats=stats, on_warning=on_warning, plan=plan, institution_groups=institution_groups
+        )
+        for event in events:
+            if event["type"] == "result":
+                result_cache.put(key, (event["df"], event["missing_authors"]))
+                event = dict(event, key=key)
+            yield event
+    finally:
+        # Lets waiting sessions take over if this one fails or is abandoned
+        result_cache.release(key)
+
+def _progress_only(events):
+    """Re-yields events with their works stripped; returns the wrapped generator's result."""
+    while True:
+        try:
+            event = next(events)
+        except StopIteration as stop:
+            return stop.value
+        yield dict(event, works=[]) if event["type"] == "works" else event
+
+def get_recent_papers(university_id, author_names, days_back, university_display_name=None,
+                      progress_callback=None, stats=None, on_warning=None, plan="auto",
+                      institution_groups=None):
+    """
+    Queries OpenAlex for papers by specific authors at a specific institution
+    from the last X days using a two-step approach:
+    1. Find author IDs by searching authors endpoint
+    2. Use author IDs to find their works
+    
+    For large rosters the planner may instead stream all of the institution's
+    works in the window once and match the roster against them locally
+    (plan="institution"); plan="author" forces the two-step approach and
+    plan="auto" picks by estimated request count. Both give the same table.
+    
+    author_names is a list of names or a comma-separated string.
+    Returns (results DataFrame, list of names that could not be matched).
+    
+    If given, progress_callback(batches_done, total_batches, pages_fetched) is
+    called from the calling thread as work pages arrive, and `stats`
+    (an openalex_client.RequestStats) collects bandwidth and decode timings.
+    Non-fatal problems go to on_warning(message) (default: the module logger).
+    
+    To compare several institutions in one run, pass their union as
+    university_id and institution_groups={label: [institution IDs]}: names
+    are resolved and works fetched once for the union, then each paper is
+    attributed to the groups its roster authors were at (see
+    results_table.institution_matrix).
+    """
+    events = iter_recent_papers(
+        university_id, author_names, days_back, university_display_name,
+        stats=stats, on_warning=on_warning, plan=plan, institution_groups=institution_groups
+    )
+    for event in events:
+        if event["type"] == "works" and progress_callback and event["total_batches"]:
+            progress_callback(event["batches_done"], event["total_batches"], event["pages_fetched"])
+        elif event["type"] == "result":
+            return event["df"], event["missing_authors"]
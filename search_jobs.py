@@ -0,0 +1,217 @@
+"""
+Background execution of searches, so the Streamlit script never blocks on one.
+
+A search submitted to the JobManager runs in a worker thread and gets a job
+ID. The session keeps only that ID and polls the job's status, progress and
+partial results on each rerun, so widgets stay usable while it runs and a
+rerun doesn't lose the work. Cancelling stops the search between events and
+drops its queued requests. Finished author lookups and completed works
+batches are already saved in the author cache and works store, so running
+the same search again only fetches what is still missing.
+"""
+import heapq
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+from search_engine import iter_shared_recent_papers
+
+# Searches running at once (each has its own pool of OpenAlex requests, all
+# sharing the client's rate limiter), and how long finished jobs are kept
+MAX_CONCURRENT_SEARCHES = int(os.environ.get("CHEWIE_MAX_CONCURRENT_SEARCHES", 4))
+FINISHED_JOB_TTL = int(os.environ.get("CHEWIE_FINISHED_JOB_TTL", 3600))
+
+# Newest works kept for the preview shown while a search runs
+PREVIEW_WORKS = 200
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class SearchJob:
+    """
+    One background search. Written by its worker thread, read by sessions;
+    read a consistent copy with snapshot().
+    """
+
+    def __init__(self, params, stats=None):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.stats = stats
+        self.status = QUEUED
+        self.progress = {}
+        self.papers_found = 0
+        self._preview = []  # min-heap of (publication date, work ID, work): the newest PREVIEW_WORKS
+        self._seen_work_ids = set()
+        self.warnings = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        """Asks the search to stop at its next event."""
+        self._cancel.set()
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def snapshot(self):
+        """
+        Returns a dict of the job's current state. While it runs,
+        preview_works holds the newest PREVIEW_WORKS works seen so far (any
+        order) and papers_found counts distinct works.
+        """
+        with self._lock:
+            return {
+                "id": self.id,
+                "status": self.status,
+                "progress": dict(self.progress),
+                "papers_found": self.papers_found,
+                "preview_works": [work for _, _, work in self._preview],
+                "warnings": list(self.warnings),
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+            }
+
+    def _finish(self, status, result=None, error=None):
+        with self._lock:
+            self.finished_at = time.time()
+            self.result = result
+            self.error = error
+            self.status = status
+            # The result (or nothing, if stopped) replaces the preview
+            self._preview = []
+            self._seen_work_ids = set()
+
+    def _add_to_preview(self, works):
+        # Caller holds the lock. Kept up to date per event, so polling costs
+        # the same however many works the search has found.
+        for work in works:
+            work_id = work.get('id')
+            if not work_id or work_id in self._seen_work_ids:
+                continue
+            self._seen_work_ids.add(work_id)
+            self.papers_found += 1
+            entry = (work.get('publication_date') or "", work_id, work)
+            if len(self._preview) < PREVIEW_WORKS:
+                heapq.heappush(self._preview, entry)
+            elif entry[:2] > self._preview[0][:2]:
+                heapq.heapreplace(self._preview, entry)
+
+    def run(self):
+        """Runs the search in the calling thread, recording events as they arrive."""
+        if self.cancel_requested:
+            self._finish(CANCELLED)
+            return
+        with self._lock:
+            self.status = RUNNING
+
+        def warn(message):
+            with self._lock:
+                self.warnings.append(message)
+
+        # The cancel flag also ends a wait on an identical search from another session
+        events = iter_shared_recent_papers(
+            **self.params, stats=self.stats, on_warning=warn, cancelled=self._cancel
+        )
+        try:
+            for event in events:
+                if self.cancel_requested:
+                    # Closing the generator cancels queued requests and keeps
+                    # finished lookups and batches in the local caches
+                    events.close()
+                    self._finish(CANCELLED)
+                    return
+                with self._lock:
+                    if event["type"] == "authors":
+                        self.progress.update(resolved=event["resolved"], total=event["total"])
+                    elif event["type"] == "works":
+                        self.progress.update(
+                            batches_done=event["batches_done"],
+                            total_batches=event["total_batches"],
+                            pages_fetched=event["pages_fetched"],
+                        )
+                        self._add_to_preview(event["works"])
+                if event["type"] == "result":
+                    # The table itself stays in the shared result cache (within
+                    # its memory budget); the job only says where to find it
+                    self._finish(DONE, result={
+                        "key": event["key"], "missing_authors": event["missing_authors"], "papers": len(event["df"])
+                    })
+        except CancelledError:
+            self._finish(CANCELLED)
+        except Exception as e:
+            events.close()
+            self._finish(FAILED, error=f"{type(e).__name__}: {e}")
+
+
+class JobManager:
+    """Runs SearchJobs on a thread pool and keeps them addressable by ID."""
+
+    def __init__(self, max_workers=MAX_CONCURRENT_SEARCHES, finished_ttl=FINISHED_JOB_TTL):
+        self.finished_ttl = finished_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chewie-search")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, params, stats=None):
+        """
+        Queues a search. `params` are keyword arguments for
+        iter_shared_recent_papers (without stats/on_warning). Returns the job.
+        """
+        job = SearchJob(params, stats=stats)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._executor.submit(job.run)
+        return job
+
+    def get(self, job_id):
+        """Returns the job with this ID, or None if unknown or expired."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Requests cancellation; returns False if the job is unknown or already finished."""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel()
+        return True
+
+    def _prune(self):
+        # Caller holds the lock; forgets jobs that finished long ago
+        cutoff = time.time() - self.finished_ttl
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """Returns the process-wide JobManager instance."""
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = JobManager()
+        return _default_manager
@@ -0,0 +1,489 @@
+"""
+Offline backend: answers Chewie's OpenAlex queries from a local snapshot index.
+
+The index is built from OpenAlex snapshot partitions (gzipped JSON lines of
+works and authors, data/works/updated_date=*/part_*.gz and likewise for
+authors). Each partition becomes one segment, so ingestion is incremental:
+re-running it only processes new or changed partitions. A segment holds
+
+- `<name>.jsonl`: the records, trimmed to the fields Chewie reads
+- sorted int64 postings files, (key, record number, offset, length) each:
+  works by (author ID, publication date), by (institution ID, publication
+  date) and by work ID; authors by name-token hash and by author ID
+
+At query time every file is memory-mapped and postings are found by binary
+search, so only the records on the requested page are read and decoded.
+Records in later partitions (newer updated_date) replace earlier copies.
+
+When openalex_client has a SnapshotIndex as its backend (set_backend, or
+the CHEWIE_SNAPSHOT_DIR environment variable), get_recent_papers and both
+query plans run against the index without touching the network.
+
+    python snapshot_index.py ingest INDEX_DIR snapshot/data/works/*/part_*.gz snapshot/data/authors/*/part_*.gz
+    CHEWIE_SNAPSHOT_DIR=INDEX_DIR streamlit run app.py
+    python chewie_cli.py jobs.csv --snapshot INDEX_DIR
+"""
+import argparse
+import array
+import base64
+import bisect
+import glob
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import sys
+import threading
+from collections import OrderedDict
+from datetime import date
+from urllib.parse import urlparse
+
+import numpy as np
+
+from openalex_client import decode_json
+from vip_matcher import name_tokens, short_author_id as short_id
+
+# int64 fields per posting: (key, record number, offset, length)
+POSTING_FIELDS = 4
+
+# Work postings are keyed on (ID number << _DATE_BITS) | publication date ordinal
+_DATE_BITS = 20
+_DATE_MASK = (1 << _DATE_BITS) - 1
+_MAX_DAY = _DATE_MASK
+
+# Result lists kept for paging through a query without recomputing it
+_RESULT_CACHE_SIZE = 64
+
+MAX_PER_PAGE = 200
+
+MANIFEST = "manifest.json"
+
+
+def _id_number(openalex_id):
+    """'https://openalex.org/A5012345678' -> 5012345678 (0 if absent)."""
+    digits = short_id(openalex_id or "")[1:]
+    return int(digits) if digits.isdigit() else 0
+
+
+def _day(publication_date):
+    try:
+        return date.fromisoformat(publication_date).toordinal()
+    except (TypeError, ValueError):
+        return 0
+
+
+def _token_hash(token):
+    # 63-bit, so it fits a signed int64 posting key
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little") >> 1
+
+
+def _trim_work(work):
+    authorships = []
+    for authorship in work.get("authorships") or []:
+        author = authorship.get("author") or {}
+        authorships.append({
+            "author": {"id": author.get("id"), "display_name": author.get("display_name")},
+            "institutions": [{"id": inst.get("id")} for inst in authorship.get("institutions") or []],
+        })
+    return {
+        "id": work.get("id"),
+        "display_name": work.get("display_name") or work.get("title"),
+        "publication_date": work.get("publication_date"),
+        "doi": work.get("doi"),
+        "primary_location": work.get("primary_location"),
+        "authorships": authorships,
+    }
+
+
+def _trim_author(author):
+    institutions = author.get("last_known_institutions")
+    if institutions is None and author.get("last_known_institution"):
+        # Older snapshots have a single last_known_institution
+        institutions = [author["last_known_institution"]]
+    return {
+        "id": author.get("id"),
+        "display_name": author.get("display_name"),
+        "display_name_alternatives": author.get("display_name_alternatives") or [],
+        "last_known_institutions": [{"id": inst.get("id")} for inst in institutions or []],
+    }
+
+
+def _name_token_sets(author):
+    return [set(name_tokens(name)) for name in [author.get("display_name") or ""] + author["display_name_alternatives"]]
+
+
+def _iter_partition(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield decode_json(line)
+
+
+def _write_postings(path, entries):
+    entries.sort()
+    values = array.array("q")
+    for entry in entries:
+        values.extend(entry)
+    with open(path, "wb") as f:
+        values.tofile(f)
+
+
+def build_segment(partition, directory, name, kind):
+    """Writes the segment files for one snapshot partition of `kind` ("works" or "authors")."""
+    postings = {"works": ("by_author", "by_institution", "by_id"), "authors": ("by_token", "by_id")}[kind]
+    entries = {posting: [] for posting in postings}
+    records_path = os.path.join(directory, f"{name}.jsonl")
+    offset = 0
+    with open(records_path + ".tmp", "wb") as out:
+        for number, record in enumerate(_iter_partition(partition)):
+            if not record.get("id"):
+                continue
+            trimmed = _trim_work(record) if kind == "works" else _trim_author(record)
+            data = json.dumps(trimmed, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            out.write(data + b"\n")
+            record_number = _id_number(trimmed["id"])
+            location = (record_number, offset, len(data))
+            offset += len(data) + 1
+
+            entries["by_id"].append((record_number,) + location)
+            if kind == "works":
+                day = _day(trimmed["publication_date"])
+                author_numbers = set()
+                institution_numbers = set()
+                for authorship in trimmed["authorships"]:
+                    author_numbers.add(_id_number(authorship["author"]["id"]))
+                    institution_numbers.update(_id_number(inst["id"]) for inst in authorship["institutions"])
+                for author_number in author_numbers - {0}:
+                    entries["by_author"].append(((author_number << _DATE_BITS) | day,) + location)
+                for institution_number in institution_numbers - {0}:
+                    entries["by_institution"].append(((institution_number << _DATE_BITS) | day,) + location)
+            else:
+                tokens = set().union(*_name_token_sets(trimmed))
+                for token in tokens:
+                    entries["by_token"].append((_token_hash(token),) + location)
+
+    for posting in postings:
+        _write_postings(os.path.join(directory, f"{name}.{posting}.tmp"), entries[posting])
+    # Move into place only once everything is written, so a crash leaves no half segment
+    os.replace(records_path + ".tmp", records_path)
+    for posting in postings:
+        os.replace(os.path.join(directory, f"{name}.{posting}.tmp"), os.path.join(directory, f"{name}.{posting}"))
+    return offset
+
+
+class _Postings:
+    """A memory-mapped, sorted postings file searched by key."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self.values = memoryview(self._map).cast("q")
+            else:
+                self._map = None
+                self.values = memoryview(array.array("q"))
+        # Strided view of the keys alone, so bisect runs without Python-level indexing
+        self.keys = self.values[::POSTING_FIELDS]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def range(self, low, high):
+        """Yields (key, record number, offset, length) for low <= key <= high."""
+        start = bisect.bisect_left(self.keys, low)
+        end = bisect.bisect_right(self.keys, high, lo=start)
+        values = self.values
+        for i in range(start * POSTING_FIELDS, end * POSTING_FIELDS, POSTING_FIELDS):
+            yield values[i], values[i + 1], values[i + 2], values[i + 3]
+
+
+class _Segment:
+    """One ingested partition: memory-mapped records plus postings."""
+
+    def __init__(self, directory, name, kind):
+        self.kind = kind
+        with open(os.path.join(directory, f"{name}.jsonl"), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._records = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        postings = ("by_author", "by_institution", "by_id") if kind == "works" else ("by_token", "by_id")
+        for posting in postings:
+            setattr(self, posting, _Postings(os.path.join(directory, f"{name}.{posting}")))
+
+    def read(self, offset, length):
+        return decode_json(self._records[offset:offset + length])
+
+
+def _parse_filter(filter_str):
+    filters = {}
+    for clause in filter_str.split(","):
+        if not clause:
+            continue
+        key, sep, value = clause.partition(":")
+        if not sep:
+            raise ValueError(f"Invalid filter clause {clause!r}")
+        filters[key] = value
+    return filters
+
+
+def _day_range(filters):
+    # Publication-date filters as an inclusive (first, last) day ordinal range
+    first, last = 0, _MAX_DAY
+    condition = filters.get("publication_date")
+    if condition:
+        if condition.startswith(">"):
+            first = _day(condition[1:]) + 1
+        elif condition.startswith("<"):
+            last = _day(condition[1:]) - 1
+        else:
+            first = last = _day(condition)
+    if "from_publication_date" in filters:
+        first = max(first, _day(filters["from_publication_date"]))
+    if "to_publication_date" in filters:
+        last = min(last, _day(filters["to_publication_date"]))
+    return first, last
+
+
+def _newest_positions(segments):
+    """
+    {record number: position of its newest segment} for the records with a
+    copy in more than one segment; any other copy is the only one. Built from
+    the by_id postings in one vectorized pass.
+    """
+    if len(segments) < 2:
+        return {}
+    keys = [np.asarray(segment.by_id.values)[::POSTING_FIELDS] for segment in segments]
+    numbers = np.concatenate(keys)
+    positions = np.repeat(np.arange(len(segments)), [len(k) for k in keys])
+    order = np.lexsort((positions, numbers))
+    numbers, positions = numbers[order], positions[order]
+    # Runs of equal numbers, oldest segment first; the run's last entry is the newest copy
+    starts = np.flatnonzero(np.r_[True, numbers[1:] != numbers[:-1]])
+    ends = np.r_[starts[1:], len(numbers)] - 1
+    copied = ends[ends > starts]
+    return dict(zip(numbers[copied].tolist(), positions[copied].tolist()))
+
+
+class SnapshotIndex:
+    """Query side of a snapshot index directory. Safe to share across threads."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        manifest = read_manifest(directory)
+        self.segments = {"works": [], "authors": []}
+        for entry in manifest["segments"]:
+            self.segments[entry["kind"]].append(_Segment(directory, entry["name"], entry["kind"]))
+        self._newest = {kind: _newest_positions(segments) for kind, segments in self.segments.items()}
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url, params):
+        """
+        Answers an OpenAlex list request (/works or /authors with the filters
+        Chewie uses, cursor or page pagination and select=) like the API.
+        Returns (response dict, bytes of records read). Raises ValueError for
+        queries the index can't answer.
+        """
+        endpoint = urlparse(url).path.rstrip("/").rsplit("/", 1)[-1]
+        filter_str = params.get("filter", "")
+        cache_key = (endpoint, filter_str)
+        with self._lock:
+            matches = self._results.get(cache_key)
+            if matches is not None:
+                self._results.move_to_end(cache_key)
+        if matches is None:
+            filters = _parse_filter(filter_str)
+            if endpoint == "works":
+                matches = self._works(filters)
+            elif endpoint == "authors":
+                matches = self._authors(filters)
+            else:
+                raise ValueError(f"The snapshot index has no {endpoint!r} endpoint")
+            with self._lock:
+                self._results[cache_key] = matches
+                while len(self._results) > _RESULT_CACHE_SIZE:
+                    self._results.popitem(last=False)
+
+        per_page = min(int(params.get("per_page", 25)), MAX_PER_PAGE)
+        if "cursor" in params:
+            cursor = params["cursor"]
+            offset = 0 if cursor in ("", "*") else int(base64.urlsafe_b64decode(cursor.encode()))
+        else:
+            offset = (int(params.get("page", 1)) - 1) * per_page
+        page = matches[offset:offset + per_page]
+        next_cursor = None
+        if "cursor" in params and offset + per_page < len(matches):
+            next_cursor = base64.urlsafe_b64encode(str(offset + per_page).encode()).decode()
+
+        results = [segment.read(record_offset, length) for segment, record_offset, length in page]
+        select = params.get("select")
+        if select:
+            fields = select.split(",")
+            results = [{field: record.get(field) for field in fields if field in record} for record in results]
+        meta = {"count": len(matches), "per_page": per_page, "next_cursor": next_cursor}
+        return {"meta": meta, "results": results}, sum(length for _, _, length in page)
+
+    def _is_latest(self, kind, position, record_number):
+        # A record is stale if a later partition has a newer copy
+        return self._newest[kind].get(record_number, position) == position
+
+    def _works(self, filters):
+        supported = {
+            "authorships.author.id", "authorships.institutions.id", "publication_date",
+            "from_publication_date", "to_publication_date",
+        }
+        unknown = set(filters) - supported
+        if unknown:
+            raise ValueError(f"Unsupported works filter(s): {', '.join(sorted(unknown))}")
+        authors = {_id_number(i) for i in filters.get("authorships.author.id", "").split("|") if i}
+        institutions = {_id_number(i) for i in filters.get("authorships.institutions.id", "").split("|") if i}
+        if not authors and not institutions:
+            raise ValueError("Works queries need an author or institution filter")
+        first_day, last_day = _day_range(filters)
+
+        # Author postings are the narrower list; institutions are then checked on the record
+        posting, keys = ("by_author", authors) if authors else ("by_institution", institutions)
+        found = {}
+        for position, segment in enumerate(self.segments["works"]):
+            for key in keys:
+                for composite, work_number, offset, length in getattr(segment, posting).range(
+                    (key << _DATE_BITS) | first_day, (key << _DATE_BITS) | last_day
+                ):
+                    found[work_number] = (composite & _DATE_MASK, position, offset, length)
+
+        matches = []
+        for work_number, (day, position, offset, length) in found.items():
+            segment = self.segments["works"][position]
+            if not self._is_latest("works", position, work_number):
+                continue
+            if authors and institutions:
+                work = segment.read(offset, length)
+                if not any(
+                    _id_number(inst["id"]) in institutions
+                    for authorship in work["authorships"] for inst in authorship["institutions"]
+                ):
+                    continue
+            matches.append((day, work_number, segment, offset, length))
+        # Newest first, like sort=publication_date:desc
+        matches.sort(key=lambda match: (-match[0], match[1]))
+        return [(segment, offset, length) for _, _, segment, offset, length in matches]
+
+    def _authors(self, filters):
+        supported = {"display_name.search", "last_known_institutions.id", "id"}
+        unknown = set(filters) - supported
+        if unknown:
+            raise ValueError(f"Unsupported authors filter(s): {', '.join(sorted(unknown))}")
+        search = set(name_tokens(filters.get("display_name.search", "")))
+        ids = {_id_number(i) for i in filters["id"].split("|")} if "id" in filters else None
+        institutions = {_id_number(i) for i in filters["last_known_institutions.id"].split("|")} \
+            if "last_known_institutions.id" in filters else None
+        if not search and ids is None:
+            raise ValueError("Author queries need a display_name.search or id filter")
+
+        matches = []
+        seen = set()
+        # Newest partitions first, so the first copy of an author found is current
+        for position in reversed(range(len(self.segments["authors"]))):
+            segment = self.segments["authors"][position]
+            if ids is not None:
+                candidates = [posting for i in ids for posting in segment.by_id.range(i, i)]
+            else:
+                candidates = list(segment.by_token.range(_token_hash(min(search)), _token_hash(min(search))))
+            for _, author_number, offset, length in candidates:
+                if author_number in seen:
+                    continue
+                # Only the current copy counts, even if an older one still has a
+                # matching name (the current one isn't under the old name's tokens)
+                seen.add(author_number)
+                if not self._is_latest("authors", position, author_number):
+                    continue
+                author = segment.read(offset, length)
+                if search and not any(search <= tokens for tokens in _name_token_sets(author)):
+                    continue
+                if ids is not None and author_number not in ids:
+                    continue
+                if institutions is not None and not any(
+                    _id_number(inst["id"]) in institutions for inst in author["last_known_institutions"]
+                ):
+                    continue
+                matches.append((segment, offset, length))
+        return matches
+
+
+def read_manifest(directory):
+    """The index's list of ingested partitions ({"segments": [...]})."""
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return {"segments": []}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def partition_kind(path):
+    """
+    'works' or 'authors', from the snapshot's folder layout: the folder
+    holding the partition's updated_date=* folder (data/<kind>/updated_date=*/),
+    or the partition itself. Folders further up don't count.
+    """
+    folders = os.path.normpath(os.path.abspath(path)).split(os.sep)[:-1]
+    if folders and folders[-1].startswith("updated_date="):
+        folders = folders[:-1]
+    if folders and folders[-1] in ("works", "authors"):
+        return folders[-1]
+    raise ValueError(
+        f"Can't tell whether {path} holds works or authors; it should be under "
+        "a works/ or authors/ folder (data/<kind>/updated_date=*/part_*.gz)"
+    )
+
+
+def ingest(directory, partitions, log=None):
+    """
+    Adds snapshot partitions to the index in `directory`, skipping ones
+    already ingested and unchanged. Partitions are ordered by path, which
+    for snapshot folders (updated_date=YYYY-MM-DD) is oldest first.
+    Returns the number of partitions (re)built.
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest = read_manifest(directory)
+    existing = {entry["partition"]: entry for entry in manifest["segments"]}
+    built = 0
+    for partition in sorted(os.path.abspath(path) for path in partitions):
+        stat = os.stat(partition)
+        entry = existing.get(partition)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            continue
+        kind = partition_kind(partition)
+        name = f"{kind}-{hashlib.sha1(partition.encode()).hexdigest()[:16]}"
+        num_bytes = build_segment(partition, directory, name, kind)
+        existing[partition] = {
+            "partition": partition, "kind": kind, "name": name,
+            "size": stat.st_size, "mtime": stat.st_mtime, "bytes": num_bytes,
+        }
+        # Save after every partition so an interrupted ingest resumes where it stopped
+        manifest["segments"] = sorted(existing.values(), key=lambda e: e["partition"])
+        with open(os.path.join(directory, MANIFEST + ".tmp"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(os.path.join(directory, MANIFEST + ".tmp"), os.path.join(directory, MANIFEST))
+        built += 1
+        if log:
+            log(f"Indexed {partition} ({num_bytes / 1e6:.1f} MB of records)")
+    return built
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a local OpenAlex snapshot index for offline searches.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = subcommands.add_parser("ingest", help="index snapshot partitions (new or changed ones only)")
+    ingest_parser.add_argument("index_dir")
+    ingest_parser.add_argument("partitions", nargs="+", help="part_*.gz files or glob patterns")
+    args = parser.parse_args(argv)
+
+    paths = [path for pattern in args.partitions for path in sorted(glob.glob(pattern)) or [pattern]]
+    built = ingest(args.index_dir, paths, log=print)
+    print(f"{built} partition(s) indexed, {len(paths) - built} unchanged.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
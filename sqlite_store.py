@@ -0,0 +1,47 @@
+"""
+Shared plumbing for Chewie's on-disk SQLite caches and stores (author
+lookups, works, institutions, run history).
+
+Each store is a SQLite file under CACHE_DIR in WAL mode, so several
+Streamlit sessions/processes can read and write it at once, with one
+connection per thread.
+"""
+import os
+import sqlite3
+import threading
+
+# Where cache files live; override with CHEWIE_CACHE_DIR
+CACHE_DIR = os.environ.get("CHEWIE_CACHE_DIR", ".chewie_cache")
+
+# Keep each IN (...) query well under SQLite's bound-parameter limit
+QUERY_BATCH = 500
+
+
+def institutions_key(institution_ids):
+    """Order-independent key for a set of institution IDs."""
+    if isinstance(institution_ids, str):
+        institution_ids = institution_ids.split("|")
+    return "|".join(sorted(set(i for i in institution_ids if i)))
+
+
+class SQLiteStore:
+    """
+    Base for the on-disk stores: a SQLite file opened once per thread, since
+    sqlite3 connections must not be shared.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
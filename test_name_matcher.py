@@ -0,0 +1,56 @@
+"""
+Checks of the roster name matching rules in name_matcher.
+"""
+import pytest
+
+from name_matcher import NameIndex
+
+
+def _matches(roster_name, *candidate_names):
+    index = NameIndex(
+        {"id": f"A{n}", "display_name": name} for n, name in enumerate(candidate_names, start=1)
+    )
+    return index.match(roster_name)
+
+
+@pytest.mark.parametrize("roster_name, candidate_name", [
+    # Accents and case are folded
+    ("Gül Dölen", "Gul Dolen"),
+    ("James Nuñez", "JAMES NUNEZ"),
+    ("James Nunez", "James Nuñez"),
+    # Initials match full given names, either way round
+    ("J. Doudna", "Jennifer A. Doudna"),
+    ("Jennifer A. Doudna", "J. A. Doudna"),
+    # Hyphenated given names match their run-together form, either way round
+    ("Jun-Chau Chien", "Junchau Chien"),
+    ("Junchau Chien", "Jun-Chau Chien"),
+    ("Jun Chau Chien", "Junchau Chien"),
+    # Extra candidate middle names, and roster middle initials the candidate omits
+    ("Jennifer Doudna", "Jennifer Anne Doudna"),
+    ("Jennifer A. Doudna", "Jennifer Doudna"),
+    # Word order
+    ("Gül Dölen", "Dolen Gul"),
+    ("Doudna Jennifer", "Jennifer Doudna"),
+])
+def test_matches(roster_name, candidate_name):
+    assert _matches(roster_name, candidate_name) == ["A1"]
+
+
+@pytest.mark.parametrize("roster_name, candidate_name", [
+    ("Jane Doudna", "Jennifer Doudna"),
+    ("Jennifer Doudna", "Jennifer Dowd"),
+    ("K. Doudna", "Jennifer Doudna"),
+    ("Junchau Chien", "Jun-Chen Chien"),
+])
+def test_non_matches(roster_name, candidate_name):
+    assert _matches(roster_name, candidate_name) == []
+
+
+def test_full_matches_rank_before_initials():
+    assert _matches("Jennifer Doudna", "J. Doudna", "Jennifer Doudna") == ["A2", "A1"]
+
+
+def test_middle_initials_only_dropped_when_nothing_matches():
+    # "Jennifer A. Doudna" matches the first with its initial, so the second
+    # (no middle name) isn't offered
+    assert _matches("Jennifer A. Doudna", "Jennifer Anne Doudna", "Jennifer Doudna") == ["A1"]
@@ -0,0 +1,29 @@
+"""
+Checks of result_cache's memory accounting.
+"""
+import sys
+
+from result_cache import result_size
+from results_table import build_results
+
+
+def _works(count, authors_per_work):
+    return [
+        {
+            "id": f"https://openalex.org/W{n}",
+            "display_name": f"Paper {n}",
+            "publication_date": "2024-05-01",
+            "authorships": [
+                {"author": {"id": f"https://openalex.org/A{n}{k:03d}", "display_name": f"Author{k} Surname{n}"},
+                 "institutions": [{"id": "https://openalex.org/I1"}]}
+                for k in range(authors_per_work)
+            ],
+        }
+        for n in range(count)
+    ]
+
+
+def test_result_size_counts_names_inside_tuple_columns():
+    df = build_results(_works(200, 12), None, institution_groups={"Group": ["I1"]})
+    names = sum(sys.getsizeof(name) for names in df["_author_names"] for name in names)
+    assert result_size((df, [])) >= df.memory_usage(index=True, deep=True).sum() + names
@@ -0,0 +1,28 @@
+"""
+End-to-end check of get_recent_papers against a local snapshot index: it
+gives the same table as the (mock) API it was built from.
+
+    python -m pytest -q
+"""
+from pandas.testing import assert_frame_equal
+
+import openalex_client
+from mock_openalex import write_snapshot
+from snapshot_index import SnapshotIndex, ingest
+
+
+def test_snapshot_index_matches_api(fixture_data, search, fresh_caches, tmp_path):
+    dataset, roster, _ = fixture_data
+    df_api, missing_api = search(roster)
+
+    partitions = write_snapshot(dataset, str(tmp_path / "snapshot"))
+    ingest(str(tmp_path / "index"), partitions)
+    fresh_caches()
+    openalex_client.set_backend(SnapshotIndex(str(tmp_path / "index")))
+    try:
+        df_snapshot, missing_snapshot = search(roster)
+    finally:
+        openalex_client.set_backend(None)
+
+    assert_frame_equal(df_api, df_snapshot)
+    assert missing_api == missing_snapshot
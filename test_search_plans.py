@@ -0,0 +1,47 @@
+"""
+Checks of the query planner's two plans against mock_openalex: both give
+the same table, including a paper whose roster author is listed past the
+first 100 authorships.
+"""
+from pandas.testing import assert_frame_equal
+
+
+def test_consortium_paper_found_past_listed_authorships(fixture_data, search):
+    df, _ = search(fixture_data[1], "author")
+    assert "Consortium paper" in set(df["Title"])
+    authors = df.loc[df["Title"] == "Consortium paper", "_author_names"].iloc[0]
+    assert len(authors) == 150
+
+
+def test_consortium_paper_not_linked_to_other_roster_authors(fixture_data, search):
+    # The full roster's search stores the consortium paper; a later search
+    # for someone who isn't on it must not find it
+    _, roster, consortium_author = fixture_data
+    search(roster, "author")
+    others = [name for name in roster if name != consortium_author]
+    df, _ = search(others, "author")
+    assert "Consortium paper" not in set(df["Title"])
+
+
+def test_author_and_institution_plans_match(fixture_data, search, fresh_caches):
+    roster = fixture_data[1]
+    df_author, missing_author = search(roster, "author")
+    fresh_caches()
+    df_institution, missing_institution = search(roster, "institution")
+
+    assert "Consortium paper" in set(df_author["Title"])
+    assert_frame_equal(df_author, df_institution)
+    assert missing_author == missing_institution
+
+
+def test_rerun_after_institution_plan_skips_name_lookups(fixture_data, search, api):
+    # Names matched on the institution's works are cached for the same window,
+    # so a rerun goes straight to the (incremental) works sync
+    roster = fixture_data[1]
+    df_first, missing_first = search(roster, "institution")
+    api.reset_counts()
+    df_again, missing_again = search(roster)
+
+    assert api.request_counts.get("authors", 0) == 0
+    assert_frame_equal(df_first, df_again)
+    assert missing_first == missing_again
@@ -0,0 +1,84 @@
+"""
+Checks of snapshot_index on small hand-written partitions.
+"""
+import gzip
+import json
+import os
+
+import pytest
+
+from snapshot_index import SnapshotIndex, ingest, partition_kind
+
+OPENALEX_PREFIX = "https://openalex.org/"
+
+
+def _write_partition(root, kind, updated_date, records):
+    folder = os.path.join(root, "data", kind, f"updated_date={updated_date}")
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, "part_000.gz")
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    return path
+
+
+def _author(name, institution_id):
+    return {
+        "id": OPENALEX_PREFIX + "A1",
+        "display_name": name,
+        "last_known_institutions": [{"id": OPENALEX_PREFIX + institution_id}],
+    }
+
+
+def _work(institution_id, publication_date):
+    return {
+        "id": OPENALEX_PREFIX + "W1",
+        "display_name": "A paper",
+        "publication_date": publication_date,
+        "authorships": [{
+            "author": {"id": OPENALEX_PREFIX + "A1", "display_name": "Jane Doe"},
+            "institutions": [{"id": OPENALEX_PREFIX + institution_id}],
+        }],
+    }
+
+
+def _search_authors(index, filter_str):
+    data, _ = index.get(OPENALEX_PREFIX + "authors", {"filter": filter_str})
+    return [author["display_name"] for author in data["results"]]
+
+
+def test_renamed_author_only_found_under_current_name(tmp_path):
+    partitions = [
+        _write_partition(str(tmp_path), "authors", "2024-01-01", [_author("Jane Oldname", "I1")]),
+        _write_partition(str(tmp_path), "authors", "2024-02-01", [_author("Jane Newname", "I2")]),
+    ]
+    ingest(str(tmp_path / "index"), partitions)
+    index = SnapshotIndex(str(tmp_path / "index"))
+
+    assert _search_authors(index, "display_name.search:oldname,last_known_institutions.id:I1") == []
+    assert _search_authors(index, "display_name.search:newname") == ["Jane Newname"]
+
+
+def test_superseded_work_copies_are_skipped(tmp_path):
+    partitions = [
+        _write_partition(str(tmp_path), "works", f"2024-01-0{n}", [_work(institution_id, "2024-01-01")])
+        for n, institution_id in enumerate(["I1", "I2", "I1", "I2"], start=1)
+    ] + [_write_partition(str(tmp_path), "works", "2024-01-05", [])]
+    ingest(str(tmp_path / "index"), partitions)
+    index = SnapshotIndex(str(tmp_path / "index"))
+
+    def count(institution_id):
+        data, _ = index.get(OPENALEX_PREFIX + "works", {
+            "filter": f"authorships.institutions.id:{institution_id},publication_date:>2023-12-31"
+        })
+        return data["meta"]["count"]
+
+    assert (count("I1"), count("I2")) == (0, 1)
+
+
+def test_partition_kind_ignores_folders_above_the_snapshot():
+    assert partition_kind("/srv/works/openalex/data/authors/updated_date=2024-01-01/part_000.gz") == "authors"
+    assert partition_kind("/srv/authors/openalex/data/works/updated_date=2024-01-01/part_000.gz") == "works"
+    assert partition_kind("snapshot/works/part_000.gz") == "works"
+    with pytest.raises(ValueError):
+        partition_kind("/srv/works/openalex/misc/part_000.gz")
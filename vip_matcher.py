@@ -0,0 +1,110 @@
+"""
+VIP author matching.
+
+The VIP list is compiled once into a token index: every name is Unicode-folded
+(accents stripped, case-folded) and split into tokens, and indexed by its first
+token. Matching an author name is then one dict lookup per token instead of a
+substring scan over every VIP, so long author lists stay cheap. VIPs can also
+be pinned to OpenAlex author IDs, which are matched exactly.
+"""
+import re
+import unicodedata
+
+_TOKEN_SPLIT = re.compile(r"[^\w]+")
+
+# Upper bound on memoized author names before the memo is reset
+_NAME_MEMO_LIMIT = 200_000
+
+
+def name_tokens(name):
+    """Folds a name to accent-free lowercase tokens: 'Gül Dölen' -> ('gul', 'dolen')."""
+    if name.isascii():
+        # Nothing to fold; skips the per-character pass for most names and titles
+        folded = name.lower()
+    else:
+        decomposed = unicodedata.normalize("NFKD", name)
+        folded = "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+    return tuple(token for token in _TOKEN_SPLIT.split(folded) if token)
+
+
+def short_author_id(author_id):
+    """'https://openalex.org/A123' -> 'A123' (already-short IDs pass through)."""
+    return author_id.rsplit("/", 1)[-1] if author_id else author_id
+
+
+class VIPMatcher:
+    """Matches authorships against a fixed VIP list."""
+
+    def __init__(self, names, author_ids=None):
+        """
+        `names` is an iterable of VIP display names. `author_ids` optionally
+        maps OpenAlex author IDs (long or short form) to one of those names.
+        """
+        self.names = []
+        self._by_first_token = {}
+        for name in dict.fromkeys(names):
+            tokens = name_tokens(name)
+            if not tokens:
+                continue
+            self.names.append(name)
+            self._by_first_token.setdefault(tokens[0], []).append((tokens, name))
+        self._by_id = {
+            short_author_id(author_id): name for author_id, name in (author_ids or {}).items()
+        }
+        self._name_memo = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Loads a VIP list from a text file: one name per line, optionally
+        followed by a tab and an OpenAlex author ID. Blank lines and lines
+        starting with '#' are skipped.
+        """
+        names = []
+        author_ids = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                name, _, author_id = line.partition("\t")
+                name = name.strip()
+                names.append(name)
+                if author_id.strip():
+                    author_ids[author_id.strip()] = name
+        return cls(names, author_ids)
+
+    def match_name(self, display_name):
+        """Returns the VIP names whose tokens appear, in order, within display_name."""
+        matches = self._name_memo.get(display_name)
+        if matches is not None:
+            return matches
+
+        tokens = name_tokens(display_name)
+        found = []
+        for i, token in enumerate(tokens):
+            for vip_tokens, vip_name in self._by_first_token.get(token, ()):
+                if tokens[i:i + len(vip_tokens)] == vip_tokens and vip_name not in found:
+                    found.append(vip_name)
+        matches = tuple(found)
+
+        if len(self._name_memo) >= _NAME_MEMO_LIMIT:
+            self._name_memo.clear()
+        self._name_memo[display_name] = matches
+        return matches
+
+    def match_authorships(self, authorships):
+        """Returns the VIP names (in authorship order, no repeats) found on a work."""
+        found = {}
+        for authorship in authorships or []:
+            author = authorship.get("author") or {}
+            vip_name = self._by_id.get(short_author_id(author.get("id")))
+            if vip_name:
+                found[vip_name] = None
+                continue
+            for name in self.match_name(author.get("display_name") or ""):
+                found[name] = None
+        return list(found)
@@ -0,0 +1,194 @@
+"""
+Local store of OpenAlex works for incremental syncing.
+
+Works are stored once, keyed by OpenAlex work ID. Each (author ID, institution
+set) pair has a sync watermark recording the earliest publication date it has
+been fetched from and when it was last synced, so later searches only need to
+ask OpenAlex for works published since the last sync.
+"""
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlite_store import CACHE_DIR, QUERY_BATCH, SQLiteStore, institutions_key
+
+# Re-fetch this many days before the last sync to pick up works that
+# OpenAlex indexes late (publication dates are often backfilled)
+SYNC_OVERLAP_DAYS = int(os.environ.get("CHEWIE_SYNC_OVERLAP_DAYS", 30))
+
+
+class WorksStore(SQLiteStore):
+    """SQLite-backed works store with per-author sync watermarks."""
+
+    def __init__(self, path=None):
+        super().__init__(path or os.path.join(CACHE_DIR, "works.sqlite"))
+        with self._connect() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS works (
+                    work_id TEXT PRIMARY KEY,
+                    publication_date TEXT,
+                    data TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS work_authors (
+                    author_id TEXT NOT NULL,
+                    institutions TEXT NOT NULL,
+                    work_id TEXT NOT NULL,
+                    PRIMARY KEY (author_id, institutions, work_id)
+                );
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    author_id TEXT NOT NULL,
+                    institutions TEXT NOT NULL,
+                    synced_from TEXT NOT NULL,
+                    synced_at TEXT NOT NULL,
+                    PRIMARY KEY (author_id, institutions)
+                );
+                """
+            )
+
+    def _select_in(self, sql, inst_key, values):
+        # Runs `sql` (which must contain "{ids}") over `values` in batches
+        conn = self._connect()
+        rows = []
+        for i in range(0, len(values), QUERY_BATCH):
+            batch = values[i:i + QUERY_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows.extend(conn.execute(sql.format(ids=placeholders), [inst_key] + batch).fetchall())
+        return rows
+
+    def plan_sync(self, author_ids, institution_ids, start_date):
+        """
+        Works out what each author still needs fetched for a window starting
+        at start_date (YYYY-MM-DD). Returns {since_date: [author IDs]}, where
+        since_date is the publication date to fetch after. Authors never
+        synced, or synced over a shorter window, get the full window.
+        """
+        inst_key = institutions_key(institution_ids)
+        unique_ids = list(dict.fromkeys(author_ids))
+        state = {
+            author_id: (synced_from, synced_at)
+            for author_id, synced_from, synced_at in self._select_in(
+                "SELECT author_id, synced_from, synced_at FROM sync_state "
+                "WHERE institutions = ? AND author_id IN ({ids})",
+                inst_key, unique_ids,
+            )
+        }
+
+        plan = {}
+        for author_id in unique_ids:
+            since = start_date
+            if author_id in state:
+                synced_from, synced_at = state[author_id]
+                if synced_from <= start_date:
+                    watermark = (
+                        datetime.strptime(synced_at, '%Y-%m-%d') - timedelta(days=SYNC_OVERLAP_DAYS)
+                    ).strftime('%Y-%m-%d')
+                    since = max(start_date, watermark)
+            plan.setdefault(since, []).append(author_id)
+        return plan
+
+    def add_works(self, works, author_ids, institution_ids):
+        """
+        Upserts fetched works and links each one to whichever of `author_ids`
+        appear in its authorships. Works matching none of them are skipped.
+        Only listed authors are linked, so works whose authorship list was
+        truncated should be replaced by the full work first.
+        """
+        inst_key = institutions_key(institution_ids)
+        wanted = set(author_ids)
+        work_rows = []
+        link_rows = []
+        for work in works:
+            work_id = work.get('id')
+            if not work_id:
+                continue
+            linked = {
+                (authorship.get('author') or {}).get('id') for authorship in work.get('authorships') or []
+            } & wanted
+            if not linked:
+                continue
+            work_rows.append((work_id, work.get('publication_date'), json.dumps(work)))
+            link_rows.extend((author_id, inst_key, work_id) for author_id in linked)
+
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO works (work_id, publication_date, data) VALUES (?, ?, ?)",
+                work_rows,
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO work_authors (author_id, institutions, work_id) VALUES (?, ?, ?)",
+                link_rows,
+            )
+
+    def mark_synced(self, author_ids, institution_ids, start_date, synced_at=None):
+        """
+        Records that `author_ids` are up to date as of synced_at (default
+        today) for a window starting at start_date. An existing wider window
+        is kept.
+        """
+        inst_key = institutions_key(institution_ids)
+        synced_at = synced_at or datetime.now().strftime('%Y-%m-%d')
+        with self._connect() as conn:
+            conn.executemany(
+                """
+                INSERT INTO sync_state (author_id, institutions, synced_from, synced_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (author_id, institutions) DO UPDATE SET
+                    synced_from = MIN(synced_from, excluded.synced_from),
+                    synced_at = excluded.synced_at
+                """,
+                [(author_id, inst_key, start_date, synced_at) for author_id in set(author_ids)],
+            )
+
+    def get_works(self, author_ids, institution_ids, start_date):
+        """
+        Returns stored works linked to any of `author_ids` published after
+        start_date, newest first, each work once.
+        """
+        inst_key = institutions_key(institution_ids)
+        unique_ids = list(dict.fromkeys(author_ids))
+        # Find matching work IDs from the index first, then load each work's
+        # JSON once; joining the data directly makes SQLite sort every blob
+        # for DISTINCT
+        rows = self._select_in(
+            "SELECT DISTINCT w.work_id, w.publication_date FROM work_authors wa "
+            "JOIN works w ON w.work_id = wa.work_id "
+            "WHERE wa.institutions = ? AND wa.author_id IN ({ids})",
+            inst_key, unique_ids,
+        )
+        dates = {work_id: pub_date or '' for work_id, pub_date in rows}
+        wanted = sorted(
+            (work_id for work_id, pub_date in dates.items() if pub_date > start_date),
+            key=lambda work_id: (dates[work_id], work_id), reverse=True,
+        )
+        conn = self._connect()
+        data = {}
+        for i in range(0, len(wanted), QUERY_BATCH):
+            batch = wanted[i:i + QUERY_BATCH]
+            data.update(conn.execute(
+                f"SELECT work_id, data FROM works WHERE work_id IN ({','.join('?' * len(batch))})", batch
+            ).fetchall())
+        return [json.loads(data[work_id]) for work_id in wanted]
+
+    def invalidate(self, institution_ids=None):
+        """Forgets sync watermarks (all, or for one institution set) so the next search refetches."""
+        with self._connect() as conn:
+            if institution_ids is None:
+                return conn.execute("DELETE FROM sync_state").rowcount
+            return conn.execute(
+                "DELETE FROM sync_state WHERE institutions = ?", (institutions_key(institution_ids),)
+            ).rowcount
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_works_store():
+    """Returns the process-wide WorksStore instance."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = WorksStore()
+        return _default_store